@@ -0,0 +1,33 @@
+-- Record how precise an event's coordinates are, so hottag_sync.py can drop
+-- an approximate city-centre pin on new events straight away (from its
+-- offline city index) and upgrade it to the venue once one is known.
+--
+--   'venue' — geocoded from the venue name/address
+--   'city'  — city-centre approximation
+--   NULL    — set before this column existed (treated as venue-level)
+--
+-- Coordinates written without touching geo_precision (admin/promoter edits)
+-- are assumed to be exact.
+--
+-- Idempotent: safe to re-run.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS geo_precision TEXT
+  CHECK (geo_precision IN ('venue', 'city'));
+
+CREATE OR REPLACE FUNCTION events_set_geo_precision()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF (NEW.latitude IS DISTINCT FROM OLD.latitude OR NEW.longitude IS DISTINCT FROM OLD.longitude)
+     AND NEW.geo_precision IS NOT DISTINCT FROM OLD.geo_precision THEN
+    NEW.geo_precision = CASE WHEN NEW.latitude IS NULL THEN NULL ELSE 'venue' END;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS events_set_geo_precision ON events;
+CREATE TRIGGER events_set_geo_precision
+  BEFORE UPDATE ON events
+  FOR EACH ROW EXECUTE FUNCTION events_set_geo_precision();
+
+CREATE INDEX IF NOT EXISTS idx_events_geo_precision_city ON events (id) WHERE geo_precision = 'city';
@@ -0,0 +1,29 @@
+-- Keep updated_at current on events and promotions so hottag_sync.py can
+-- refresh its local mirror with delta queries (updated_at > last watermark)
+-- instead of paging the whole events table every run.
+--
+-- Idempotent: safe to re-run.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now();
+ALTER TABLE promotions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now();
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS events_set_updated_at ON events;
+CREATE TRIGGER events_set_updated_at
+  BEFORE UPDATE ON events
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS promotions_set_updated_at ON promotions;
+CREATE TRIGGER promotions_set_updated_at
+  BEFORE UPDATE ON promotions
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE INDEX IF NOT EXISTS idx_events_updated_at ON events (updated_at);
+CREATE INDEX IF NOT EXISTS idx_promotions_updated_at ON promotions (updated_at);
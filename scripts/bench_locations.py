@@ -0,0 +1,62 @@
+"""
+Benchmark parse_location() over a corpus of raw_location strings.
+
+Usage:
+    python bench_locations.py                          # bundled raw_locations_sample.txt
+    python bench_locations.py events_sync.ndjson       # raw_location values from a scrape (.gz / old .json too)
+    python bench_locations.py locations.txt --repeat 50
+
+Reports per-row cost with a cold cache (first sight of each distinct string)
+and a warm cache (every later run over the same strings), plus how many rows
+resolved to a state, country and region.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import hottag_sync
+
+
+def load_corpus(path):
+    if path.suffix != '.txt':
+        return [e.raw_location for e in hottag_sync.read_records(path, hottag_sync.ScrapedEvent) if e.raw_location]
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark location normalization')
+    parser.add_argument('corpus', nargs='?', default=str(Path(__file__).parent / 'raw_locations_sample.txt'))
+    parser.add_argument('--repeat', type=int, default=20, help='Warm passes over the corpus (default: 20)')
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.corpus))
+    print(f"{len(corpus)} rows, {len(set(corpus))} distinct strings")
+
+    start = time.perf_counter()
+    hottag_sync.gazetteer()
+    print(f"Gazetteer load:  {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    hottag_sync._location_cache.clear()
+    start = time.perf_counter()
+    results = [hottag_sync.parse_location(raw) for raw in corpus]
+    cold = time.perf_counter() - start
+    print(f"Cold cache:      {cold / len(corpus) * 1e6:.2f} µs/row")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for raw in corpus:
+            hottag_sync.parse_location(raw)
+    warm = time.perf_counter() - start
+    print(f"Warm cache:      {warm / (len(corpus) * args.repeat) * 1e6:.2f} µs/row")
+
+    def share(key):
+        return f"{sum(1 for r in results if r[key]) / len(results):.0%}"
+    known_region = sum(1 for r in results if r['country'] and r['region'] != 'International')
+    print(f"Resolved:        state {share('state')}, country {share('country')}, "
+          f"region (not International) {known_region / len(results):.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,30 +3,83 @@ HotTag - Unified Event Pipeline
 One script to rule them all: scrape worldwide events from Cagematch,
 load into Supabase, fetch venue details, and geocode for maps.
 
-Excludes: WWE, NXT, AEW, TNA, IMPACT
+Excludes: WWE, NXT, AEW, TNA, IMPACT (see sync_rules.json)
 
 Usage:
     python hottag_sync.py                    # Default 120 days
     python hottag_sync.py --days 90          # Custom range
+    python hottag_sync.py --from 2026-04-17 --to 2026-04-19  # Just one weekend (seeks, no full sweep)
     python hottag_sync.py --skip-details     # Skip venue detail scraping (faster)
+    python hottag_sync.py --refresh-budget 100  # Re-check up to 100 known event pages for changes
     python hottag_sync.py --skip-geocode     # Skip geocoding
-    python hottag_sync.py --dry-run          # Scrape only, don't load into DB
+    python hottag_sync.py --dry-run          # Scrape only (to events_sync.ndjson), don't load into DB
+    python hottag_sync.py --daemon           # Long-running; health at http://127.0.0.1:8787/health
+    python hottag_sync.py --jobs 1           # Run the stages one at a time (default: independent ones in parallel)
+
+Single steps (each imports and configures only what it needs):
+    python hottag_sync.py scrape --days 7 --output week.ndjson.gz
+    python hottag_sync.py load --input week.ndjson.gz --output new_ids.json
+    python hottag_sync.py details --input new_ids.json   # Venue, times, tickets, match card, talent
+    python hottag_sync.py reprocess                       # Re-parse the stored event pages, no fetching
+    python hottag_sync.py geocode --input new_ids.json
+    python hottag_sync.py championships
+
+Sharded crawl (any number of worker processes, each with its own rate budget
+and e.g. its own proxy, sharing the queue file; merge does all Supabase writes
+— repeat worker+merge until the run is done). The queue file must stay on one
+host's local disk: SQLite's WAL locking doesn't work over NFS/SMB, so workers
+on other machines would need another transport to the queue:
+    python hottag_sync.py coordinate --days 120
+    python hottag_sync.py worker               # in each worker process
+    python hottag_sync.py merge                # listing -> details -> geocode
+
+Change feed (every insert/link/rename/enrichment/geocode/title change, with
+before and after values, in hottag_changes.db or HOTTAG_CHANGELOG; poll
+from the last seq you processed):
+    python hottag_sync.py changes --since 1234 > changes.ndjson
+
+Offline city coordinates (new events get approximate map pins at load time;
+Google is then only asked about events with a venue):
+    python hottag_sync.py build-city-index --cities cities15000.txt --admin1 admin1CodesASCII.txt
+    (GeoNames dumps from https://download.geonames.org/export/dump/)
 
 Requires .env file with:
     SUPABASE_URL=https://your-project.supabase.co
     SUPABASE_KEY=your_service_role_key
     GOOGLE_MAPS_API_KEY=your_google_maps_key
+
+Local state (retry backoff for venue details/geocoding, detail refresh
+schedule, a mirror of the event/promotion columns the load dedups against,
+the last fetched copy of each event page and the match cards written from them)
+is kept in hottag_state.db next to this script; override with
+HOTTAG_STATE_DB. Deleting it just means the next run rebuilds it.
 """
 
-import requests
-from bs4 import BeautifulSoup
+# requests / bs4 are imported inside the steps that use them, so single-step
+# subcommands (e.g. geocode) don't pay for parsers they never touch
 from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from itertools import islice
+from urllib.parse import quote
 import json
+import gzip
+import base64
+import sys
 import time
 import argparse
 import logging
 import re
 import os
+import sqlite3
+import hashlib
+import random
+import threading
+import bisect
+import unicodedata
+import mmap
+import struct
+import socket
+import zlib
 from pathlib import Path
 
 # ============================================
@@ -39,26 +92,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load .env
-env_path = Path(__file__).parent / '.env'
-if env_path.exists():
-    with open(env_path) as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                os.environ[key.strip()] = value.strip()
-
-SUPABASE_URL = os.environ.get('SUPABASE_URL', '')
-SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '')
-GOOGLE_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY') or os.environ.get('NEXT_PUBLIC_GOOGLE_MAPS_API_KEY', '')
-
-DB_HEADERS = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "return=minimal",
-}
+# Filled in by load_config() on first use
+SUPABASE_URL = ''
+SUPABASE_KEY = ''
+GOOGLE_API_KEY = ''
+DB_HEADERS = {}
+_config_loaded = False
+
+
+def load_config():
+    """Read .env and the credentials derived from it (once, on first use)"""
+    global SUPABASE_URL, SUPABASE_KEY, GOOGLE_API_KEY, DB_HEADERS, _config_loaded
+    if _config_loaded:
+        return
+    env_path = Path(__file__).parent / '.env'
+    if env_path.exists():
+        with open(env_path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    os.environ[key.strip()] = value.strip()
+
+    SUPABASE_URL = os.environ.get('SUPABASE_URL', '')
+    SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '')
+    GOOGLE_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY') or os.environ.get('NEXT_PUBLIC_GOOGLE_MAPS_API_KEY', '')
+    DB_HEADERS = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal",
+    }
+    _config_loaded = True
 
 SCRAPE_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
@@ -67,84 +132,1012 @@ SCRAPE_HEADERS = {
 
 BASE_URL = "https://www.cagematch.net"
 
-# Promotions to EXCLUDE
-EXCLUDED_PROMOTIONS = [
-    'world wrestling entertainment', 'wwe',
-    'all elite wrestling', 'aew',
-    'total nonstop action wrestling', 'tna wrestling', 'tna',
-    'impact wrestling', 'impact',
-    'wwe nxt', 'nxt',
-    'wwe raw', 'wwe smackdown', 'wwe speed',
-    'aew dynamite', 'aew collision', 'aew rampage',
-]
-
-# Title prefixes belonging to major promotions — skip when scraping a different promotion
-# Cagematch lists titles from other orgs that were defended at a promotion's events
-FOREIGN_TITLE_PREFIXES = [
-    'NWA ', 'TNA ', 'WWE ', 'AEW ', 'IMPACT ', 'ROH ', 'NJPW ', 'CMLL ', 'AAA ',
-    'GCW ', 'MLW ', 'ECW ', 'WCW ',
-]
+def parse_html(text):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(text, 'html.parser')
+
+
+# Shared HTTP sessions (connection pooling; stay warm across daemon cycles)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def http_session(kind):
+    """Reusable requests.Session per traffic kind: 'scrape' (Cagematch), 'db' (Supabase), 'geo' (Google)"""
+    with _sessions_lock:
+        if kind not in _sessions:
+            import requests
+            load_config()
+            session = requests.Session()
+            if kind == 'scrape':
+                session.headers.update(SCRAPE_HEADERS)
+            elif kind == 'db':
+                session.headers.update(DB_HEADERS)
+            _sessions[kind] = session
+        return _sessions[kind]
+
+# Excluded promotions, foreign title prefixes, ticket platforms and auto-tags
+# (e.g. vegas_weekend) live in this file — see compile_rules()
+RULES_PATH = Path(os.environ.get('HOTTAG_RULES') or Path(__file__).parent / 'sync_rules.json')
+
+# Countries (with region), subdivisions and aliases for parse_location()
+GAZETTEER_PATH = Path(os.environ.get('HOTTAG_GAZETTEER') or Path(__file__).parent / 'gazetteer.json')
+
+# City-level coordinates, memory-mapped (see build_city_index()); optional
+CITY_INDEX_PATH = Path(os.environ.get('HOTTAG_CITY_INDEX') or Path(__file__).parent / 'city_index.bin')
+
+# Local sync state (attempt tracking etc.) — not shared with Supabase
+STATE_DB_PATH = Path(os.environ.get('HOTTAG_STATE_DB') or Path(__file__).parent / 'hottag_state.db')
+
+# Append-only feed of what each sync changed, for downstream consumers (see `changes`).
+# Kept apart from the state DB: that one is disposable, sequence numbers must not be
+CHANGELOG_DB_PATH = Path(os.environ.get('HOTTAG_CHANGELOG') or Path(__file__).parent / 'hottag_changes.db')
+
+# Enrichment retry backoff: 12h, 24h, 48h, ... capped at 30 days
+RETRY_BASE_HOURS = 12
+RETRY_MAX_HOURS = 30 * 24
+
+# Detail page refresh scheduler
+REFRESH_BUDGET = 40          # Detail pages re-scraped per run
+REFRESH_MIN_GAP_HOURS = 12   # Never re-scrape a page sooner than this unless its listing changed
+REFRESH_STALE_HOURS = 72     # Page age at which staleness counts fully
+REFRESH_FIELDS = ['venue_name', 'venue_address', 'event_time', 'doors_time', 'ticket_url']
+
+# Match cards / announced talent from event pages are written this many events at a time
+CARD_BATCH = 50
+
+# Cagematch event listing paging
+LISTING_PAGE_SIZE = 100
+LISTING_MAX_OFFSET = 3000
+
+# Scraped events are auto-tagged and loaded this many at a time
+LOAD_CHUNK = 500
+
+# Local mirror: full id/updated_at comparison against the server this often
+MIRROR_VERIFY_HOURS = 24
+
+# Cagematch pacing (requests/second): additive increase while healthy,
+# multiplicative decrease on 429/5xx/slow responses
+CM_RATE_START = 1 / 1.5
+CM_RATE_MIN = 1 / 30
+CM_RATE_MAX = 1.0
+CM_RATE_STEP = 0.02          # Added per healthy response
+CM_RATE_BACKOFF = 0.5        # Multiplied on a throttle/error signal
+CM_SLOW_SECONDS = 8          # A response slower than this counts as the site struggling
+CM_RETRIES = 3               # Retries per request after the first attempt
+CM_BREAKER_FAILURES = 5      # Consecutive failures that open the circuit
+CM_BREAKER_COOLDOWN = 60     # Seconds the circuit stays open (doubles each time it re-opens)
+CM_BREAKER_MAX_OPENS = 4     # Re-opens without a success before giving up on the site for this run
+
+# Auto-generated homepage news
+NEWS_EXPIRE_DAYS = 10
+NEWS_TITLE_CHANGE_DAYS = 14   # Only title wins this recent make the homepage
+
+# Coordinator/worker mode: leased work items in a SQLite file shared by the workers on this host
+QUEUE_DB_PATH = Path(os.environ.get('HOTTAG_QUEUE_DB') or Path(__file__).parent / 'hottag_queue.db')
+WORK_LEASE_SECONDS = 300     # A worker that goes quiet this long loses its item to the next worker
+WORK_MAX_ATTEMPTS = 3        # Leases per item before it is marked failed
+
+# Daemon mode (intervals in minutes)
+DAEMON_LISTING_INTERVAL = 360
+DAEMON_ENRICHMENT_INTERVAL = 60
+DAEMON_CHAMPIONSHIP_INTERVAL = 24 * 60
+DAEMON_HEALTH_PORT = 8787
+
+
+# ============================================
+# LOCAL STATE
+# ============================================
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrichment_attempts (
+    stage TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    input_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_attempt_at TEXT NOT NULL,
+    next_retry_at TEXT NOT NULL,
+    PRIMARY KEY (stage, event_id)
+);
+
+CREATE TABLE IF NOT EXISTS event_refresh (
+    event_id TEXT PRIMARY KEY,
+    listing_hash TEXT,
+    listing_changed_at TEXT,
+    detail_scraped_at TEXT
+);
+
+-- Mirror of the Supabase columns load_events dedups against
+CREATE TABLE IF NOT EXISTS events_mirror (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    event_date TEXT,
+    promotion_id TEXT,
+    cagematch_id TEXT,
+    admin_edited INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_mirror_cagematch ON events_mirror (cagematch_id);
+CREATE INDEX IF NOT EXISTS idx_events_mirror_promo_date ON events_mirror (promotion_id, event_date);
+
+CREATE TABLE IF NOT EXISTS promotions_mirror (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    slug TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS mirror_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Last fetched Cagematch event page per event (zlib), so `reprocess` can re-parse without refetching
+CREATE TABLE IF NOT EXISTS event_pages (
+    event_id TEXT PRIMARY KEY,
+    source_url TEXT,
+    fetched_at TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+
+-- The match card we last wrote per event, so a refresh only rewrites cards that changed
+-- and never touches matches added on HotTag itself
+CREATE TABLE IF NOT EXISTS event_cards (
+    event_id TEXT PRIMARY KEY,
+    card_hash TEXT NOT NULL,
+    match_ids TEXT NOT NULL
+);
+"""
+
+class Rows(list):
+    """Query results, read in full while the connection was held"""
+
+    def fetchone(self):
+        return self[0] if self else None
+
+    def fetchall(self):
+        return list(self)
+
+
+class SharedConnection:
+    """A sqlite3 connection shared by concurrently running stages (run_stages).
+    sqlite3 leaves serializing a shared connection to the caller, so every
+    call holds the lock (and reads its rows in full under it). Hold `lock`
+    yourself around read-then-write sequences that must not interleave."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.RLock()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return Rows(self.conn.execute(sql, params).fetchall())
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            self.conn.executemany(sql, rows)
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+
+_state_conn = None
+_state_lock = threading.Lock()
+
+# Run metrics, served by the daemon health endpoint
+metrics = {'jobs': {}, 'queues': {}}
+
+
+def state_db():
+    """Open (once) the local SQLite state file and make sure the schema exists"""
+    global _state_conn
+    with _state_lock:
+        if _state_conn is None:
+            conn = sqlite3.connect(STATE_DB_PATH, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(STATE_SCHEMA)
+            _state_conn = SharedConnection(conn)
+    return _state_conn
+
+
+def retry_delay_hours(attempts):
+    """Exponential backoff for known-empty enrichment results"""
+    return min(RETRY_BASE_HOURS * 2 ** max(attempts - 1, 0), RETRY_MAX_HOURS)
+
+
+def filter_due(stage, events, input_key=None):
+    """Drop events whose last attempt at this stage came back empty and aren't due for a retry yet.
+
+    If input_key is given, an event whose input changed since the last attempt
+    (e.g. its address was filled in) is retried right away.
+    """
+    rows = state_db().execute(
+        "SELECT event_id, input_key, next_retry_at FROM enrichment_attempts WHERE stage = ?", (stage,)
+    ).fetchall()
+    attempts = {r['event_id']: r for r in rows}
+    now = datetime.now().isoformat()
+
+    due = []
+    for e in events:
+        a = attempts.get(str(e['id']))
+        if a is None or a['next_retry_at'] <= now:
+            due.append(e)
+        elif input_key and input_key(e) != a['input_key']:
+            due.append(e)
+    return due
+
+
+def record_attempt(stage, event_id, found, input_key=None):
+    """Remember the outcome of an enrichment attempt. A hit clears the history."""
+    db = state_db()
+    with db.lock:
+        if found:
+            db.execute("DELETE FROM enrichment_attempts WHERE stage = ? AND event_id = ?", (stage, str(event_id)))
+        else:
+            row = db.execute(
+                "SELECT attempts, input_key FROM enrichment_attempts WHERE stage = ? AND event_id = ?",
+                (stage, str(event_id)),
+            ).fetchone()
+            # A changed input starts a fresh backoff sequence
+            attempts = row['attempts'] + 1 if row and row['input_key'] == input_key else 1
+            now = datetime.now()
+            next_retry = now + timedelta(hours=retry_delay_hours(attempts))
+            db.execute(
+                """INSERT INTO enrichment_attempts (stage, event_id, input_key, attempts, last_attempt_at, next_retry_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (stage, event_id) DO UPDATE SET
+                     input_key = excluded.input_key, attempts = excluded.attempts,
+                     last_attempt_at = excluded.last_attempt_at, next_retry_at = excluded.next_retry_at""",
+                (stage, str(event_id), input_key, attempts, now.isoformat(), next_retry.isoformat()),
+            )
+        db.commit()
+
+
+def listing_fingerprint(event):
+    """Hash of the listing fields for a scraped event, to spot listing changes between runs"""
+    parts = [event.name or '', event.event_date or '', event.raw_location or '']
+    parts += sorted(event.promotion_names or [])
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
+
+
+def note_listing(event_id, event):
+    """Record the event's listing fingerprint, stamping listing_changed_at when it differs"""
+    fp = listing_fingerprint(event)
+    db = state_db()
+    with db.lock:
+        row = db.execute("SELECT listing_hash FROM event_refresh WHERE event_id = ?", (str(event_id),)).fetchone()
+        if row and row['listing_hash'] == fp:
+            return
+        now = datetime.now().isoformat()
+        db.execute(
+            """INSERT INTO event_refresh (event_id, listing_hash, listing_changed_at) VALUES (?, ?, ?)
+               ON CONFLICT (event_id) DO UPDATE SET
+                 listing_hash = excluded.listing_hash, listing_changed_at = excluded.listing_changed_at""",
+            (str(event_id), fp, now),
+        )
+
+
+def note_detail_scrape(event_id):
+    state_db().execute(
+        """INSERT INTO event_refresh (event_id, detail_scraped_at) VALUES (?, ?)
+           ON CONFLICT (event_id) DO UPDATE SET detail_scraped_at = excluded.detail_scraped_at""",
+        (str(event_id), datetime.now().isoformat()),
+    )
+    state_db().commit()
+
+
+# ============================================
+# CHANGELOG
+# ============================================
+
+# change: inserted | linked | renamed (events), enriched (venue/times/tickets),
+# card (match card written), geocoded, created | updated (championships), inserted (promotions)
+CHANGELOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    change TEXT NOT NULL,
+    before TEXT,
+    after TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_changes_entity ON changes (entity, entity_id);
+"""
+
+_changelog_conn = None
+
+
+def changelog_db():
+    """Open (once) the change feed file and make sure the schema exists"""
+    global _changelog_conn
+    with _state_lock:
+        if _changelog_conn is None:
+            conn = sqlite3.connect(CHANGELOG_DB_PATH, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # Consumers read the file while a sync appends to it
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(CHANGELOG_SCHEMA)
+            _changelog_conn = SharedConnection(conn)
+    return _changelog_conn
+
+
+def record_change(entity, entity_id, change, before=None, after=None):
+    """Append one entry to the change feed. before/after hold only the fields that changed."""
+    db = changelog_db()
+    db.execute(
+        "INSERT INTO changes (recorded_at, entity, entity_id, change, before, after) VALUES (?, ?, ?, ?, ?, ?)",
+        (datetime.now().isoformat(), entity, str(entity_id), change,
+         json.dumps(before, default=json_default) if before is not None else None,
+         json.dumps(after, default=json_default) if after is not None else None),
+    )
+    db.commit()
+
+
+def read_changes(since=0, limit=None):
+    """Feed entries with seq > since, oldest first"""
+    query = "SELECT * FROM changes WHERE seq > ? ORDER BY seq"
+    params = [since]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    for r in changelog_db().execute(query, params).fetchall():
+        yield {'seq': r['seq'], 'recorded_at': r['recorded_at'], 'entity': r['entity'],
+               'entity_id': r['entity_id'], 'change': r['change'],
+               'before': json.loads(r['before']) if r['before'] else None,
+               'after': json.loads(r['after']) if r['after'] else None}
+
+
+# ============================================
+# CLASSIFICATION RULES
+# ============================================
+
+class RuleSet:
+    """sync_rules.json compiled into matchers: one regex per name/URL list,
+    and a per-city interval index of date windows for auto-tags"""
+
+    def __init__(self, config):
+        excluded = [t.lower().strip() for t in config['excluded_promotions']]
+        # "excluded term in name" — one alternation, longest terms first
+        self.excluded_re = re.compile('|'.join(re.escape(t) for t in sorted(excluded, key=len, reverse=True)))
+        # "name in excluded term" — every substring of every term, so it's a set lookup
+        self.excluded_substrings = {t[i:j] for t in excluded for i in range(len(t)) for j in range(i, len(t) + 1)}
+
+        # Titles belonging to major promotions — skip when scraping a different promotion.
+        # Cagematch lists titles from other orgs that were defended at a promotion's events
+        prefixes = sorted((p.upper().strip() for p in config['foreign_title_prefixes']), key=len, reverse=True)
+        self.foreign_title_re = re.compile(r'^(' + '|'.join(re.escape(p) for p in prefixes) + r') ')
+
+        self.ticket_re = re.compile('|'.join(re.escape(p.lower()) for p in config['ticket_platforms']))
+
+        # city -> (sorted window starts, [(start, end, column), ...])
+        windows = {}
+        for tag in config.get('auto_tags', []):
+            for city in tag['cities']:
+                windows.setdefault(city.lower().strip(), []).append((tag['start'], tag['end'], tag['column']))
+        self.tag_windows = {}
+        for city, spans in windows.items():
+            spans.sort()
+            self.tag_windows[city] = ([s[0] for s in spans], spans)
+        self.tag_labels = {t['column']: t.get('label', t['column']) for t in config.get('auto_tags', [])}
+
+    def is_excluded(self, promo_name):
+        if not promo_name:
+            return False
+        name_lower = promo_name.lower().strip()
+        return name_lower in self.excluded_substrings or bool(self.excluded_re.search(name_lower))
+
+    def excluded_batch(self, name_lists):
+        """One flag per event: excluded if any of its promotion names is"""
+        cache = {}
+        flags = []
+        for names in name_lists:
+            hit = False
+            for name in names:
+                if name not in cache:
+                    cache[name] = self.is_excluded(name)
+                if cache[name]:
+                    hit = True
+                    break
+            flags.append(hit)
+        return flags
+
+    def is_foreign_title(self, title_name, promotion_name):
+        m = self.foreign_title_re.match(title_name.upper())
+        return bool(m) and not promotion_name.upper().startswith(m.group(1))
+
+    def is_ticket_url(self, href):
+        return bool(self.ticket_re.search(href.lower()))
+
+    def tags_for(self, city, event_date):
+        """Auto-tag columns whose (city, date window) covers this event"""
+        entry = self.tag_windows.get((city or '').lower().strip())
+        if not entry or not event_date:
+            return []
+        starts, spans = entry
+        # Only windows starting on/before the date can cover it
+        return [col for start, end, col in spans[:bisect.bisect_right(starts, event_date)] if event_date <= end]
+
+    def tag_batch(self, events):
+        """Auto-tag columns for each event in a batch"""
+        return [self.tags_for(e.city, e.event_date) for e in events]
+
+
+_rules = None
+
+
+def rules():
+    """The compiled rule set (sync_rules.json is read once, on first use)"""
+    global _rules
+    if _rules is None:
+        with open(RULES_PATH) as f:
+            _rules = RuleSet(json.load(f))
+    return _rules
+
+
+def is_excluded(promo_name):
+    return rules().is_excluded(promo_name)
 
 
 def is_foreign_title(title_name, promotion_name):
     """Check if a title belongs to a different major promotion"""
-    title_upper = title_name.upper()
-    promo_upper = promotion_name.upper()
-    for prefix in FOREIGN_TITLE_PREFIXES:
-        if title_upper.startswith(prefix) and not promo_upper.startswith(prefix.strip()):
-            return True
-    return False
+    return rules().is_foreign_title(title_name, promotion_name)
 
-US_STATES = [
-    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
-    'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
-    'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
-    'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
-    'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY', 'DC'
-]
-
-COUNTRY_TO_REGION = {
-    'USA': None,
-    'Canada': 'Canada', 'Mexico': 'Mexico', 'Japan': 'Japan',
-    'UK': 'United Kingdom', 'England': 'United Kingdom', 'Scotland': 'United Kingdom',
-    'Wales': 'United Kingdom', 'Northern Ireland': 'United Kingdom',
-    'Germany': 'Europe', 'Deutschland': 'Europe', 'France': 'Europe', 'Italy': 'Europe',
-    'Spain': 'Europe', 'Austria': 'Europe', 'Switzerland': 'Europe', 'Netherlands': 'Europe',
-    'Belgium': 'Europe', 'Poland': 'Europe', 'Czech Republic': 'Europe', 'Sweden': 'Europe',
-    'Norway': 'Europe', 'Finland': 'Europe', 'Denmark': 'Europe', 'Ireland': 'Europe',
-    'Portugal': 'Europe', 'Romania': 'Europe', 'Hungary': 'Europe', 'Bulgaria': 'Europe',
-    'Croatia': 'Europe', 'Serbia': 'Europe', 'Greece': 'Europe', 'Turkey': 'Europe',
-    'Australia': 'Australia & New Zealand', 'New Zealand': 'Australia & New Zealand',
-    'Brazil': 'Latin America', 'Argentina': 'Latin America', 'Chile': 'Latin America',
-    'Colombia': 'Latin America', 'Peru': 'Latin America',
-    'India': 'Asia', 'China': 'Asia', 'South Korea': 'Asia', 'Korea': 'Asia',
-    'Philippines': 'Asia', 'Singapore': 'Asia', 'Malaysia': 'Asia', 'Thailand': 'Asia',
-    'Indonesia': 'Asia', 'Vietnam': 'Asia', 'Taiwan': 'Asia', 'Hong Kong': 'Asia',
-    'South Africa': 'Africa', 'Nigeria': 'Africa', 'Kenya': 'Africa',
-    'Saudi Arabia': 'Middle East', 'Saudi-Arabia': 'Middle East', 'UAE': 'Middle East',
-    'Israel': 'Middle East', 'Puerto Rico': 'Puerto Rico',
-}
 
-TICKET_PLATFORMS = [
-    'ticket', 'eventbrite', 'showclix', 'ticketmaster', 'dice.fm', 'tixr',
-    'seetickets', 'universe', 'holdmyticket', 'eventeny', 'freshtix', 'simpletix',
-]
+# ============================================
+# LOCATION NORMALIZATION
+# ============================================
+
+def fold(text):
+    """Case- and accent-insensitive form of a place name"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower().strip(' .')
+
+
+def place_tokens(text):
+    return re.findall(r'[a-z0-9]+', fold(text))
+
+
+class Gazetteer:
+    """gazetteer.json compiled for lookups: folded country aliases in a dict,
+    subdivision codes in per-country sets and subdivision names in token tries"""
+
+    def __init__(self, config):
+        self.countries = {}   # folded alias -> country entry
+        for c in config['countries']:
+            for alias in [c['name']] + c.get('aliases', []):
+                self.countries[fold(alias)] = c
+
+        self.subdivision_countries = {}   # folded subdivision name -> country entry ("England" -> UK)
+        self.subdivisions = {}   # country name -> {'format', 'codes': {CODE: entry}, 'trie': {...}}
+        for country, spec in config['subdivisions'].items():
+            codes, trie = {}, {}
+            for item in spec['items']:
+                entry = {'country': country, 'code': item.get('code'), 'name': item['name']}
+                if item.get('code'):
+                    codes[item['code']] = entry
+                for name in [item['name']] + item.get('aliases', []):
+                    self.subdivision_countries[fold(name)] = self.countries.get(fold(country))
+                    node = trie
+                    for token in place_tokens(name):
+                        node = node.setdefault(token, {})
+                    node[None] = entry
+            self.subdivisions[country] = {'format': spec.get('state_format', 'name'), 'codes': codes, 'trie': trie}
+        # Without a known country, only US codes are trusted (e.g. "Portland, OR"); names are checked everywhere, US first
+        self.search_order = sorted(self.subdivisions, key=lambda c: c != 'USA')
+
+    def country(self, text):
+        return self.countries.get(fold(text))
+
+    def country_of(self, stored):
+        """Country entry for a stored country, which may be a subdivision Cagematch lists as the country ("England")"""
+        return self.country(stored) or self.subdivision_countries.get(fold(stored))
+
+    def region(self, country_name):
+        """Promotion region for a country ('International' if unknown, None for the USA)"""
+        entry = self.country_of(country_name) if country_name else None
+        return entry['region'] if entry else 'International'
+
+    def _match_trie(self, tokens, trie):
+        """Longest subdivision name found anywhere in the token list"""
+        best, best_len = None, 0
+        for start in range(len(tokens)):
+            node = trie
+            for n, token in enumerate(tokens[start:], 1):
+                node = node.get(token)
+                if node is None:
+                    break
+                if None in node and n > best_len:
+                    best, best_len = node[None], n
+        return best
+
+    def subdivision(self, part, country=None):
+        """Find a state/province in one comma-separated part of a location"""
+        # Codes only count as upper-case words, so "Ciudad de Mexico" isn't Delaware
+        upper_words = [w for w in re.findall(r'[A-Za-z]+', part) if w.isupper()]
+        tokens = place_tokens(part)
+        for c in ([country] if country else self.search_order):
+            subs = self.subdivisions.get(c)
+            if not subs:
+                continue
+            if country or c == 'USA':
+                for w in upper_words:
+                    if w in subs['codes']:
+                        return subs['codes'][w]
+            entry = self._match_trie(tokens, subs['trie'])
+            if entry:
+                return entry
+        return None
+
+    def resolve(self, location_str):
+        """Split a Cagematch location ("City, State, Country") into city/state/country/region.
+
+        The country is stored as Cagematch spells it ("UK", "Deutschland",
+        "England" — what the web app's region filters match on), except the
+        USA, which is always 'USA'; the gazetteer only normalizes it for the
+        state and region lookups."""
+        parts = [p.strip() for p in location_str.split(',') if p.strip()]
+        if not parts:
+            return {'city': None, 'state': None, 'country': None, 'region': None}
+        city = parts[0]
+
+        # Country: the right-most part that is a known country (a lone part may be a city-state)
+        country, k, stored = None, len(parts), None
+        for idx in range(len(parts) - 1, 0 if len(parts) > 1 else -1, -1):
+            entry = self.country(parts[idx])
+            if entry:
+                country, k, stored = entry['name'], idx, parts[idx]
+                break
+        else:
+            # "Sheffield, South Yorkshire, England": a subdivision Cagematch uses as the country
+            entry = self.subdivision_countries.get(fold(parts[-1])) if len(parts) >= 2 else None
+            if entry and entry['name'] != 'USA':
+                country, k, stored = entry['name'], len(parts) - 1, parts[-1]
+
+        sub = None
+        for part in parts[1:k]:
+            sub = self.subdivision(part, country)
+            if sub:
+                break
+        if sub and not country:
+            country = stored = sub['country']
+
+        if sub:
+            fmt = self.subdivisions[sub['country']]['format']
+            state = sub['code'] if fmt == 'code' else sub['name']
+        elif country and self.subdivisions.get(country, {}).get('format') == 'code':
+            state = None
+        else:
+            state = parts[1] if k >= 2 and len(parts) >= 3 else None
+
+        if not country and len(parts) >= 2:
+            country = stored = parts[-1]  # Unknown to the gazetteer — keep Cagematch's spelling
+        if country == 'USA':
+            stored = 'USA'
+
+        return {'city': city, 'state': state, 'country': stored, 'region': self.region(country) if country else None}
+
+
+_gazetteer = None
+_location_cache = {}   # interned raw location string -> resolved location
+
+
+def gazetteer():
+    """The compiled gazetteer (gazetteer.json is read once, on first use)"""
+    global _gazetteer
+    if _gazetteer is None:
+        with open(GAZETTEER_PATH, encoding='utf-8') as f:
+            _gazetteer = Gazetteer(json.load(f))
+    return _gazetteer
+
+
+def parse_location(location_str):
+    if not location_str:
+        return {'city': None, 'state': None, 'country': None, 'region': None}
+    key = sys.intern(location_str)
+    loc = _location_cache.get(key)
+    if loc is None:
+        loc = _location_cache[key] = gazetteer().resolve(location_str)
+    return dict(loc)
 
 
 # ============================================
-# STEP 1: SCRAPE EVENTS FROM CAGEMATCH
+# CITY COORDINATES
 # ============================================
 
-def is_excluded(promo_name):
-    if not promo_name:
-        return False
-    name_lower = promo_name.lower().strip()
-    for excl in EXCLUDED_PROMOTIONS:
-        if excl in name_lower or name_lower in excl:
-            return True
-    return False
+CITY_INDEX_MAGIC = b'HTCITY1\n'
+CITY_RECORD = struct.Struct('<Qff')   # key hash, latitude, longitude — sorted by key
+
+
+def canonical_state(state, country):
+    """A state/province spelled the way parse_location() would store it"""
+    if not state:
+        return None
+    sub = gazetteer().subdivision(state, country) if country else None
+    if not sub:
+        return state
+    return sub['code'] if gazetteer().subdivisions[country]['format'] == 'code' else sub['name']
+
+
+def city_key(city, state, country):
+    """64-bit hash of a normalized (city, state, country); state may be None"""
+    text = '|'.join(' '.join(place_tokens(p)) if p else '' for p in (city, state, country))
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class CityIndex:
+    """Read-only view of city_index.bin: fixed-size records binary-searched
+    straight out of the memory map, so opening it costs nothing"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(CITY_INDEX_MAGIC)] != CITY_INDEX_MAGIC:
+            raise ValueError(f"{path} is not a city index (rebuild it with build-city-index)")
+        self.count = (len(self._map) - len(CITY_INDEX_MAGIC)) // CITY_RECORD.size
+
+    def get(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k, lat, lng = CITY_RECORD.unpack_from(self._map, len(CITY_INDEX_MAGIC) + mid * CITY_RECORD.size)
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                return round(lat, 5), round(lng, 5)
+        return None
+
+
+_city_index = None
+
+
+def city_index():
+    """The memory-mapped city index, or None if it hasn't been built"""
+    global _city_index
+    if _city_index is None:
+        if not CITY_INDEX_PATH.exists():
+            logger.info(f"No city index at {CITY_INDEX_PATH} — no offline coordinates (see build-city-index)")
+            _city_index = False
+        else:
+            _city_index = CityIndex(CITY_INDEX_PATH)
+    return _city_index or None
+
+
+def city_coordinates(city, state, country):
+    """Approximate (lat, lng) for a city with no network call, or (None, None)"""
+    index = city_index()
+    if not index or not city or not country:
+        return None, None
+    entry = gazetteer().country_of(country)
+    country = entry['name'] if entry else country
+    state = canonical_state(state, country)
+    hit = (state and index.get(city_key(city, state, country))) or index.get(city_key(city, None, country))
+    return hit or (None, None)
+
+
+def build_city_index(cities_path, admin1_path, countries_path=None, output=CITY_INDEX_PATH):
+    """Compile a GeoNames cities dump (e.g. cities15000.txt) into city_index.bin.
+
+    Each city is keyed by (name, state, country) and by (name, country); when
+    names collide the most populous city wins, and GeoNames' alternate names
+    only fill keys no primary name claimed."""
+    countries = {c['iso']: c['name'] for c in gazetteer().countries.values() if c.get('iso')}
+    if countries_path:
+        # countryInfo.txt: ISO, ISO3, numeric, FIPS, name, ...
+        with open(countries_path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#') or not line.strip():
+                    continue
+                cols = line.rstrip('\n').split('\t')
+                countries.setdefault(cols[0], cols[4])
+
+    # admin1CodesASCII.txt: "US.NV<TAB>Nevada<TAB>Nevada<TAB>5509151"
+    admin1 = {}
+    with open(admin1_path, encoding='utf-8') as f:
+        for line in f:
+            cols = line.rstrip('\n').split('\t')
+            if len(cols) >= 2:
+                admin1[cols[0]] = cols[1]
+
+    best = {}   # key -> (rank, lat, lng); rank = (is primary name, population)
+    states = {}
+    cities = skipped = 0
+    with open(cities_path, encoding='utf-8') as f:
+        for line in f:
+            cols = line.rstrip('\n').split('\t')
+            if len(cols) < 15:
+                continue
+            country = countries.get(cols[8])
+            if not country:
+                skipped += 1
+                continue
+            cities += 1
+            lat, lng = float(cols[4]), float(cols[5])
+            population = int(cols[14] or 0)
+            admin1_name = admin1.get(f"{cols[8]}.{cols[10]}")
+            if (admin1_name, country) not in states:
+                states[(admin1_name, country)] = canonical_state(admin1_name, country)
+            state = states[(admin1_name, country)]
+
+            names = [(True, cols[1]), (True, cols[2])] + [(False, n) for n in cols[3].split(',') if n]
+            for primary, name in names:
+                if not place_tokens(name):
+                    continue
+                rank = (primary, population)
+                keys = [city_key(name, None, country)]
+                if state:
+                    keys.append(city_key(name, state, country))
+                for key in keys:
+                    if key not in best or rank > best[key][0]:
+                        best[key] = (rank, lat, lng)
+
+    tmp = Path(f"{output}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(CITY_INDEX_MAGIC)
+        for key in sorted(best):
+            _, lat, lng = best[key]
+            f.write(CITY_RECORD.pack(key, lat, lng))
+    os.replace(tmp, output)
+    logger.info(f"City index: {cities} cities, {len(best)} keys → {output} ({skipped} rows in unknown countries skipped)")
+    return len(best)
+
+
+# ============================================
+# CAGEMATCH REQUESTS
+# ============================================
+
+class CagematchUnavailable(Exception):
+    """Raised once the circuit breaker has given up on Cagematch for this run"""
+
+
+class RateController:
+    """Shared AIMD pacing and circuit breaker for all Cagematch traffic"""
+
+    def __init__(self):
+        self.rate = CM_RATE_START
+        self.next_slot = 0.0
+        self.failures = 0          # Consecutive failed attempts
+        self.opens = 0             # Consecutive circuit openings without a success
+        self.open_until = 0.0
+        self.given_up = False
+        self.stats = {'ok': 0, 'throttled': 0, 'errors': 0, 'retries': 0}
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until this caller may send its next request"""
+        with self.lock:
+            if self.given_up:
+                raise CagematchUnavailable("Cagematch circuit breaker gave up for this run")
+            now = time.time()
+            slot = max(now, self.next_slot, self.open_until)
+            self.next_slot = slot + 1 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def success(self, latency):
+        with self.lock:
+            self.stats['ok'] += 1
+            self.failures = 0
+            self.opens = 0
+            if latency > CM_SLOW_SECONDS:
+                self._decrease(f"slow response ({latency:.1f}s)")
+            else:
+                self.rate = min(self.rate + CM_RATE_STEP, CM_RATE_MAX)
+            self._publish()
+
+    def failure(self, reason, throttled=False, retry_after=None):
+        with self.lock:
+            self.stats['throttled' if throttled else 'errors'] += 1
+            self.failures += 1
+            self._decrease(reason)
+            if retry_after:
+                self.next_slot = max(self.next_slot, time.time() + retry_after)
+            if self.failures >= CM_BREAKER_FAILURES:
+                self.opens += 1
+                self.failures = 0
+                if self.opens > CM_BREAKER_MAX_OPENS:
+                    self.given_up = True
+                    logger.error(f"Cagematch circuit breaker: still failing after {CM_BREAKER_MAX_OPENS} pauses, giving up for this run")
+                else:
+                    cooldown = CM_BREAKER_COOLDOWN * 2 ** (self.opens - 1)
+                    self.open_until = time.time() + cooldown
+                    logger.warning(f"Cagematch circuit breaker open: pausing {cooldown}s after {CM_BREAKER_FAILURES} consecutive failures")
+            self._publish()
+
+    def _decrease(self, reason):
+        old = self.rate
+        self.rate = max(self.rate * CM_RATE_BACKOFF, CM_RATE_MIN)
+        if self.rate < old:
+            logger.info(f"Cagematch rate {old:.2f} → {self.rate:.2f} req/s ({reason})")
+
+    def _publish(self):
+        metrics['cagematch'] = {'rate': round(self.rate, 3), 'circuit_open': time.time() < self.open_until,
+                                'given_up': self.given_up, **self.stats}
+
+    def reset_breaker(self):
+        """Give the site a fresh chance (e.g. at the start of a daemon cycle)"""
+        with self.lock:
+            self.given_up = False
+            self.opens = 0
+            self.failures = 0
+
+    def summary(self):
+        return (f"Cagematch: {self.rate:.2f} req/s, {self.stats['ok']} ok, {self.stats['throttled']} throttled, "
+                f"{self.stats['errors']} errors, {self.stats['retries']} retries")
+
+
+cagematch_rate = RateController()
+
+
+def cagematch_get(url):
+    """GET a Cagematch page through the shared rate controller, retrying with backoff.
+    Raises the last error if every attempt fails, or CagematchUnavailable if the site is down."""
+    from requests.exceptions import HTTPError, RequestException
+    last_error = None
+    for attempt in range(CM_RETRIES + 1):
+        if attempt:
+            cagematch_rate.stats['retries'] += 1
+            time.sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+        cagematch_rate.acquire()
+        started = time.time()
+        try:
+            resp = http_session('scrape').get(url, timeout=30)
+        except RequestException as e:
+            last_error = e
+            cagematch_rate.failure(f"request error: {e.__class__.__name__}")
+            continue
+        latency = time.time() - started
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            retry_after = resp.headers.get('Retry-After', '')
+            last_error = HTTPError(f"{resp.status_code} for {url}", response=resp)
+            cagematch_rate.failure(f"HTTP {resp.status_code}", throttled=resp.status_code == 429,
+                                   retry_after=int(retry_after) if retry_after.isdigit() else None)
+            continue
+
+        cagematch_rate.success(latency)
+        resp.raise_for_status()  # Other 4xx: the page itself is bad, retrying won't help
+        return resp
+    raise last_error
+
+
+# ============================================
+# RECORDS
+# ============================================
+
+@dataclass(slots=True)
+class ScrapedEvent:
+    """One upcoming event from the Cagematch listing"""
+    name: str
+    event_date: str
+    promotion_name: str | None = None
+    promotion_cagematch_id: str | None = None
+    promotion_names: list = field(default_factory=list)   # All co-promoters, primary first
+    city: str | None = None
+    state: str | None = None
+    country: str | None = None
+    cagematch_id: str | None = None
+    cagematch_url: str | None = None
+    raw_location: str | None = None
+
+
+@dataclass(slots=True)
+class CardWrestler:
+    """A wrestler linked on an event page, by Cagematch worker ID"""
+    cagematch_id: str
+    name: str
+    team_number: int = 1       # Side of the match (participants only)
+    is_winner: bool = False
+
+
+@dataclass(slots=True)
+class CardMatch:
+    """One match from an event page's card, in card order"""
+    match_type: str | None = None
+    championship_name: str | None = None
+    is_title_match: bool = False
+    match_title: str | None = None       # "A vs. B" as announced
+    result_summary: str | None = None    # "A defeats B (12:34)" once it has happened
+    participants: list = field(default_factory=list)   # CardWrestler
+
+
+@dataclass(slots=True)
+class EventDetail:
+    """What a Cagematch event page says about venue, times, tickets, card and talent (None = not on the page)"""
+    venue_name: str | None = None
+    venue_address: str | None = None
+    event_time: str | None = None
+    doors_time: str | None = None
+    ticket_url: str | None = None
+    matches: list = field(default_factory=list)   # CardMatch
+    talent: list = field(default_factory=list)    # CardWrestler, card order, then any other workers listed
+
+    def fields(self):
+        """The events columns the page had values for"""
+        return {k: getattr(self, k) for k in REFRESH_FIELDS if getattr(self, k) is not None}
+
+
+@dataclass(slots=True)
+class ChampionshipTitle:
+    """A title and its current holder(s) from a promotion's Cagematch title page"""
+    name: str
+    champions: list
+    won_date: str | None = None
+
+
+def record_dict(record):
+    return {k: getattr(record, k) for k in record.__slots__}
+
+
+def record_from_dict(cls, data):
+    """Build a record, ignoring keys it doesn't have (e.g. from older scrape files)"""
+    return cls(**{k: data[k] for k in cls.__slots__ if k in data})
+
+
+def event_detail_from_dict(data):
+    """EventDetail from its JSON form, nested card records included"""
+    details = record_from_dict(EventDetail, data)
+    details.matches = [record_from_dict(CardMatch, m) for m in details.matches]
+    for m in details.matches:
+        m.participants = [record_from_dict(CardWrestler, p) for p in m.participants]
+    details.talent = [record_from_dict(CardWrestler, w) for w in details.talent]
+    return details
+
+
+def json_default(value):
+    return record_dict(value) if hasattr(value, '__dataclass_fields__') else str(value)
+
+
+def open_text(path, mode='r'):
+    """Open a file for text I/O: '-' is stdin/stdout, *.gz is gzip-compressed"""
+    if path == '-':
+        return open((sys.stdin if mode == 'r' else sys.stdout).fileno(), mode, encoding='utf-8', closefd=False)
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def write_records(path, records):
+    """Stream records (or plain dicts) to an NDJSON file (gzip if the name ends
+    in .gz), one line as each is produced. Returns the number written."""
+    count = 0
+    with open_text(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=json_default))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def read_records(path, cls):
+    """Stream records back from NDJSON (or a JSON array written by older versions)"""
+    with open_text(path) as f:
+        first = f.readline()
+        if first.lstrip().startswith('['):
+            for data in json.loads(first + f.read()):
+                yield record_from_dict(cls, data)
+            return
+        if first.strip():
+            yield record_from_dict(cls, json.loads(first))
+        for line in f:
+            if line.strip():
+                yield record_from_dict(cls, json.loads(line))
 
 
+def chunked(iterable, size):
+    """Lists of up to size items from any iterable"""
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+# ============================================
+# STEP 1: SCRAPE EVENTS FROM CAGEMATCH
+# ============================================
+
 def parse_date(date_str):
     try:
         return datetime.strptime(date_str.strip(), "%d.%m.%Y").strftime("%Y-%m-%d")
@@ -159,201 +1152,322 @@ def extract_id(url):
     return match.group(1) if match else None
 
 
-def parse_location(location_str):
-    if not location_str:
-        return {'city': None, 'state': None, 'country': None}
-
-    parts = [p.strip() for p in location_str.split(',')]
-    city = parts[0] if parts else None
-    state = None
-    country = None
-
-    # Check for USA
-    is_usa = 'USA' in location_str
-    if not is_usa:
-        for part in parts:
-            for word in part.strip().split():
-                if word.upper() in US_STATES:
-                    is_usa = True
-                    break
-            if is_usa:
-                break
-
-    if is_usa:
-        country = 'USA'
-        for part in parts[1:]:
-            for word in part.strip().split():
-                if word.upper() in US_STATES:
-                    state = word.upper()
-                    break
-            if state:
-                break
-    elif len(parts) >= 2:
-        country = parts[-1].strip()
-        if len(parts) >= 3:
-            state = parts[1].strip()
-
-    return {'city': city, 'state': state, 'country': country}
+def listing_url(offset, window=None):
+    """Cagematch event listing page; with a (start, end) window, the event
+    search restricted to those dates instead"""
+    if window is None:
+        return f"{BASE_URL}/?id=1&view=cards&s={offset}"
+    start, end = (datetime.strptime(d, "%Y-%m-%d") for d in window)
+    return (f"{BASE_URL}/?id=1&view=search"
+            f"&sDateFromDay={start.day:02d}&sDateFromMonth={start.month:02d}&sDateFromYear={start.year}"
+            f"&sDateTillDay={end.day:02d}&sDateTillMonth={end.month:02d}&sDateTillYear={end.year}&s={offset}")
 
 
-def scrape_events(max_days=120):
-    """Scrape all upcoming events worldwide from Cagematch"""
-    session = requests.Session()
-    session.headers.update(SCRAPE_HEADERS)
+def parse_listing(html):
+    """One listing page as (events, row_count), in page order and whatever
+    their dates; events is None if the page has no results table"""
+    soup = parse_html(html)
+    table = soup.find('div', class_='TableContents')
+    if not table:
+        return None, 0
 
+    rows = table.find_all('tr')[1:]
     events = []
-    seen_ids = set()
-    today = datetime.now()
-    cutoff = today + timedelta(days=max_days)
+    for row in rows:
+        cells = row.find_all('td')
+        if len(cells) < 4:
+            continue
+        try:
+            event_date = parse_date(cells[1].get_text(strip=True))
+            if not event_date:
+                continue
 
-    offset = 0
-    while offset < 3000:
-        url = f"{BASE_URL}/?id=1&view=cards&s={offset}"
-        logger.info(f"Fetching offset {offset}...")
+            event_cell = cells[2]
+            event_name = event_url = promo_name = promo_id = None
+            promo_names = []
+            promo_ids = []
+
+            for link in event_cell.find_all('a'):
+                href = link.get('href', '')
+                if 'id=8' in href and 'nr=' in href:
+                    img = link.find('img')
+                    if img:
+                        name = img.get('alt') or img.get('title')
+                        if name:
+                            promo_names.append(name)
+                    pid = extract_id(href)
+                    if pid:
+                        promo_ids.append(pid)
+                elif 'id=1' in href and 'nr=' in href:
+                    event_name = link.get_text(strip=True)
+                    event_url = f"{BASE_URL}/{href}" if not href.startswith('http') else href
+
+            # Use first promotion as primary (backward compat)
+            promo_name = promo_names[0] if promo_names else None
+            promo_id = promo_ids[0] if promo_ids else None
+
+            if not event_name:
+                continue
 
-        try:
-            time.sleep(1.5)
-            resp = session.get(url, timeout=30)
-            resp.raise_for_status()
+            location_str = cells[3].get_text(strip=True)
+            location = parse_location(location_str)
+
+            events.append(ScrapedEvent(
+                name=event_name,
+                event_date=event_date,
+                promotion_name=promo_name,
+                promotion_cagematch_id=promo_id,
+                promotion_names=promo_names,
+                city=location['city'],
+                state=location['state'],
+                country=location['country'],
+                cagematch_id=extract_id(event_url),
+                cagematch_url=event_url,
+                raw_location=location_str,
+            ))
         except Exception as e:
-            logger.error(f"Request failed: {e}")
-            break
+            logger.warning(f"Row parse error: {e}")
+    return events, len(rows)
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        table = soup.find('div', class_='TableContents')
-        if not table:
-            break
 
-        rows = table.find_all('tr')
-        if len(rows) <= 1:
-            break
+class ListingCrawl:
+    """Listing pages for one crawl, fetched on demand and kept by page number
+    so seeking and walking never request the same page twice"""
 
-        found = 0
-        past_cutoff = 0
+    def __init__(self, window=None):
+        self.window = window      # Passed to listing_url (the date-filtered search)
+        self.pages = {}
+        self.fetched = 0
 
-        for row in rows[1:]:
-            cells = row.find_all('td')
-            if len(cells) < 4:
-                continue
+    def page(self, n):
+        """(events, row_count) for page n — (None, None) if it couldn't be fetched,
+        (None, 0) if it has no results table. CagematchUnavailable propagates."""
+        if n not in self.pages:
+            offset = n * LISTING_PAGE_SIZE
+            logger.info(f"Fetching offset {offset}...")
             try:
-                event_date = parse_date(cells[1].get_text(strip=True))
-                if not event_date:
-                    continue
+                resp = cagematch_get(listing_url(offset, self.window))
+                self.pages[n] = parse_listing(resp.text)
+            except CagematchUnavailable:
+                raise
+            except Exception as e:
+                # One bad page shouldn't truncate the rest of the crawl
+                logger.warning(f"Skipping offset {offset} after retries: {e}")
+                self.pages[n] = (None, None)
+            self.fetched += 1
+        return self.pages[n]
+
+
+def seek_listing(crawl, start, end):
+    """First listing page that can hold events in [start, end], and whether the
+    listing runs forward in time. Gallops then binary-searches over page
+    numbers by the last row date on each page, so a window deep in the listing
+    costs O(log pages) fetches and a window at the front costs one."""
+    events, _ = crawl.page(0)
+    if not events:
+        return 0, True
+    ascending = events[0].event_date <= events[-1].event_date
+
+    def before_window(n):
+        page_events, _ = crawl.page(n)
+        if not page_events:
+            return False   # Past the end of the listing (or unreadable) — stop seeking here
+        last = page_events[-1].event_date
+        return last < start if ascending else last > end
+
+    if not before_window(0):
+        return 0, ascending
+    max_pages = LISTING_MAX_OFFSET // LISTING_PAGE_SIZE
+    lo, hi, step = 0, max_pages, 1   # Page lo is before the window; hi is not
+    while lo + step < max_pages:
+        if before_window(lo + step):
+            lo, step = lo + step, step * 2
+        else:
+            hi = lo + step
+            break
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if before_window(mid):
+            lo = mid
+        else:
+            hi = mid
+    logger.info(f"Seeked to offset {hi * LISTING_PAGE_SIZE} ({crawl.fetched} pages probed)")
+    return hi, ascending
 
-                event_dt = datetime.strptime(event_date, "%Y-%m-%d")
-                if event_dt < today:
-                    continue
-                if event_dt > cutoff:
-                    past_cutoff += 1
-                    continue
 
-                event_cell = cells[2]
-                event_name = event_url = promo_name = promo_id = None
-                promo_names = []
-                promo_ids = []
-
-                for link in event_cell.find_all('a'):
-                    href = link.get('href', '')
-                    if 'id=8' in href and 'nr=' in href:
-                        img = link.find('img')
-                        if img:
-                            name = img.get('alt') or img.get('title')
-                            if name:
-                                promo_names.append(name)
-                        pid = extract_id(href)
-                        if pid:
-                            promo_ids.append(pid)
-                    elif 'id=1' in href and 'nr=' in href:
-                        event_name = link.get_text(strip=True)
-                        event_url = f"{BASE_URL}/{href}" if not href.startswith('http') else href
-
-                # Use first promotion as primary (backward compat)
-                promo_name = promo_names[0] if promo_names else None
-                promo_id = promo_ids[0] if promo_ids else None
-
-                if not event_name:
-                    continue
-                # Check ALL promotion names against exclusions
-                if any(is_excluded(name) for name in promo_names):
-                    continue
-                # Fallback to checking single name if list is empty
-                if not promo_names and is_excluded(promo_name):
-                    continue
+_date_filter_ok = None   # Whether Cagematch honoured the search date filter (checked once per process)
+
+
+def date_filtered_crawl(start, end):
+    """A crawl of Cagematch's date-filtered event search for [start, end], or
+    None if the filter isn't honoured (rows outside the window, no results table)
+    or can't be judged (fetch failed, no rows)"""
+    global _date_filter_ok
+    if _date_filter_ok is False:
+        return None
+    crawl = ListingCrawl(window=(start, end))
+    events, row_count = crawl.page(0)
+    if row_count is None:
+        return None   # Fetch failed — no verdict on the filter
+    if events is not None and row_count == 0:
+        # An empty window and an ignored parameter look the same: seek instead
+        # (one probe) and leave the verdict to a window with rows in it
+        return None
+    ok = bool(events) and all(start <= e.event_date <= end for e in events)
+    if _date_filter_ok is None:
+        logger.info(f"Cagematch date filter {'works' if ok else 'not honoured — seeking listing offsets instead'}")
+    _date_filter_ok = bool(ok)
+    return crawl if ok else None
+
+
+def scrape_events(max_days=120, start=None, end=None):
+    """Scrape upcoming events worldwide from Cagematch, yielding each
+    ScrapedEvent as its listing page is parsed (listing order, i.e. by date).
+
+    The window defaults to today .. today + max_days. With an explicit
+    start/end (a targeted re-sync) Cagematch's date-filtered search is tried
+    first; otherwise, or if the filter isn't honoured, the listing is
+    seeked to the window and only the pages inside it are fetched."""
+    today = datetime.now().strftime("%Y-%m-%d")
+    targeted = bool(start or end)
+    start = max(start or today, today)   # Only upcoming events are synced
+    end = end or (datetime.strptime(start, "%Y-%m-%d") + timedelta(days=max_days)).strftime("%Y-%m-%d")
+    if end < start:
+        logger.warning(f"Empty date window {start} .. {end}")
+        return
 
-                location_str = cells[3].get_text(strip=True)
-                location = parse_location(location_str)
+    total = 0
+    seen_ids = set()
+    crawl, n = None, 0
+    try:
+        crawl = date_filtered_crawl(start, end) if targeted else None
+        if crawl is not None:
+            ascending = True
+        else:
+            crawl = ListingCrawl()
+            n, ascending = seek_listing(crawl, start, end)
+        if targeted:
+            logger.info(f"Crawling {start} .. {end}")
+
+        while n * LISTING_PAGE_SIZE < LISTING_MAX_OFFSET:
+            events, row_count = crawl.page(n)
+            if row_count is None:
+                n += 1
+                continue
+            if events is None:
+                break
+            in_window = [e for e in events if start <= e.event_date <= end]
 
-                cm_id = extract_id(event_url)
+            # Check ALL promotion names against exclusions, for the whole page at once
+            excluded = rules().excluded_batch([e.promotion_names for e in in_window])
+            found = 0
+            for event, skip in zip(in_window, excluded):
+                if skip:
+                    continue
+                cm_id = event.cagematch_id
                 if cm_id:
                     if cm_id in seen_ids:
                         continue
                     seen_ids.add(cm_id)
-
-                events.append({
-                    'name': event_name,
-                    'event_date': event_date,
-                    'promotion_name': promo_name,
-                    'promotion_cagematch_id': promo_id,
-                    'promotion_names': promo_names,  # NEW: all co-promoter names
-                    'city': location['city'],
-                    'state': location['state'],
-                    'country': location['country'],
-                    'cagematch_id': cm_id,
-                    'cagematch_url': event_url,
-                    'raw_location': location_str,
-                })
                 found += 1
-            except Exception as e:
-                logger.warning(f"Row parse error: {e}")
+                yield event
+            total += found
+            logger.info(f"  Found {found} events")
 
-        logger.info(f"  Found {found} events")
-        if found == 0 and past_cutoff > 50:
-            break
-        if len(rows) < 50:
-            break
-        offset += 100
+            # Everything after a page that ends beyond the window is beyond it too
+            if events and (events[-1].event_date > end if ascending else events[-1].event_date < start):
+                break
+            if row_count < 50:
+                break
+            n += 1
+    except CagematchUnavailable as e:
+        logger.error(f"Crawl stopped at offset {n * LISTING_PAGE_SIZE}, results are incomplete: {e}")
 
-    events.sort(key=lambda x: x['event_date'])
-    logger.info(f"Total scraped: {len(events)} events")
-    return events
+    logger.info(f"Total scraped: {total} events ({crawl.fetched if crawl else 0} listing pages fetched)")
+    logger.info(cagematch_rate.summary())
 
 
 # ============================================
 # STEP 2: LOAD INTO SUPABASE
 # ============================================
 
-def db_get(endpoint):
+def db_url(path):
+    load_config()
+    return f"{SUPABASE_URL}/rest/v1/{path}"
+
+
+def db_get(endpoint, strict=False):
+    """GET rows; [] on any error, or None with strict (so a failed read can't pass for an empty one)"""
+    from requests.exceptions import RequestException
+    failed = None if strict else []
     try:
-        resp = requests.get(f"{SUPABASE_URL}/rest/v1/{endpoint}", headers=DB_HEADERS, timeout=30)
-        return resp.json() if resp.status_code == 200 else []
-    except requests.exceptions.RequestException as e:
+        resp = http_session('db').get(db_url(endpoint), timeout=30)
+        if resp.status_code == 200:
+            return resp.json()
+        logger.warning(f"db_get error: HTTP {resp.status_code} for {endpoint.split('?')[0]}")
+        return failed
+    except RequestException as e:
         logger.warning(f"db_get error: {e}")
-        return []
+        return failed
 
 
 def db_post(table, data, prefer_header=None):
-    headers = {**DB_HEADERS, "Prefer": prefer_header or "return=representation"}
+    from requests.exceptions import RequestException
     try:
-        resp = requests.post(f"{SUPABASE_URL}/rest/v1/{table}", headers=headers, json=data, timeout=30)
+        resp = http_session('db').post(db_url(table), headers={"Prefer": prefer_header or "return=representation"}, json=data, timeout=30)
         if resp.status_code == 201:
             return resp.json()[0] if prefer_header != "resolution=ignore-duplicates" else True
         elif resp.status_code == 200:
             # 200 OK when using resolution=ignore-duplicates on conflict
             return True
-    except requests.exceptions.RequestException as e:
+    except RequestException as e:
         logger.warning(f"db_post error ({table}): {e}")
     return None
 
 
+def db_post_many(table, rows, on_conflict=None):
+    """Insert several rows in one request; returns the created rows ([] on failure).
+    With on_conflict (e.g. 'event_id,wrestler_id'), rows that already exist are skipped."""
+    from requests.exceptions import RequestException
+    if not rows:
+        return []
+    # PostgREST wants one column list for the whole batch; absent keys take the column default
+    columns = list(dict.fromkeys(k for row in rows for k in row))
+    path = f"{table}?columns={','.join(columns)}"
+    prefer = "return=representation,missing=default"
+    if on_conflict:
+        path += f"&on_conflict={on_conflict}"
+        prefer += ",resolution=ignore-duplicates"
+    try:
+        resp = http_session('db').post(db_url(path), headers={"Prefer": prefer}, json=rows, timeout=60)
+        if resp.status_code == 201:
+            return resp.json()
+        logger.warning(f"db_post_many error ({table}): HTTP {resp.status_code} {resp.text[:200]}")
+    except RequestException as e:
+        logger.warning(f"db_post_many error ({table}): {e}")
+    return []
+
+
 def db_patch(table, filter_str, data):
+    from requests.exceptions import RequestException
     try:
-        resp = requests.patch(f"{SUPABASE_URL}/rest/v1/{table}?{filter_str}", headers=DB_HEADERS, json=data, timeout=30)
+        resp = http_session('db').patch(db_url(f"{table}?{filter_str}"), json=data, timeout=30)
         return resp.status_code == 204
-    except requests.exceptions.RequestException as e:
+    except RequestException as e:
         logger.warning(f"db_patch error ({table}): {e}")
         return False
 
 
+def db_delete(table, filter_str):
+    from requests.exceptions import RequestException
+    try:
+        resp = http_session('db').delete(db_url(f"{table}?{filter_str}"), timeout=30)
+        return resp.status_code == 204
+    except RequestException as e:
+        logger.warning(f"db_delete error ({table}): {e}")
+        return False
+
+
 def normalize_event_name(name):
     """Normalize event name for comparison: lowercase, strip punctuation/extra spaces"""
     return re.sub(r'[^a-z0-9 ]', '', name.lower()).strip()
@@ -368,117 +1482,279 @@ def names_match(name_a, name_b):
     return a == b or a in b or b in a
 
 
-def load_events(events):
-    """Load scraped events into Supabase, creating promotions as needed"""
-    logger.info("Fetching existing promotions...")
-    promos = {p['name'].lower(): p for p in db_get("promotions?select=id,name,slug")}
-    logger.info(f"  {len(promos)} promotions in DB")
-
-    logger.info("Fetching existing event IDs...")
-    existing = {}  # cagematch_id (str) -> {id, name, admin_edited}
+def fetch_all(endpoint, page_size=1000, strict=False):
+    """Page through a PostgREST select until exhausted. With strict, a failed
+    page makes the whole read return None instead of a truncated list."""
+    rows = []
     offset = 0
     while True:
-        batch = db_get(f"events?select=id,name,cagematch_id,admin_edited&not.cagematch_id.is.null&limit=1000&offset={offset}")
+        batch = db_get(f"{endpoint}&limit={page_size}&offset={offset}", strict=strict)
+        if batch is None:
+            return None
         if not batch:
             break
-        for e in batch:
-            if e.get('cagematch_id'):
-                existing[str(e['cagematch_id'])] = {
-                    'id': e['id'],
-                    'name': e.get('name', ''),
-                    'admin_edited': e.get('admin_edited', False),
-                }
-        if len(batch) < 1000:
+        rows.extend(batch)
+        if len(batch) < page_size:
             break
-        offset += 1000
-    logger.info(f"  {len(existing)} existing events (with cagematch_id)")
+        offset += page_size
+    return rows
+
+
+def fetch_events(query, event_ids=None, page_size=500, strict=False):
+    """Page through an events select, optionally restricted to the given event IDs"""
+    if event_ids is None:
+        return fetch_all(f"events?{query}", page_size=page_size, strict=strict)
+    ids = [str(i) for i in event_ids]
+    rows = []
+    # Keep id=in.(...) lists short enough for a URL
+    for i in range(0, len(ids), 200):
+        batch = fetch_all(f"events?{query}&id=in.({','.join(ids[i:i + 200])})", page_size=page_size, strict=strict)
+        if batch is None:
+            return None
+        rows.extend(batch)
+    return rows
+
+
+def db_count(table, filter_str=''):
+    """Exact row count for a table/filter, or None if the server didn't say"""
+    from requests.exceptions import RequestException
+    try:
+        resp = http_session('db').head(db_url(f"{table}?select=id{'&' + filter_str if filter_str else ''}"),
+                                       headers={"Prefer": "count=exact"}, timeout=30)
+        total = resp.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else None
+    except RequestException as e:
+        logger.warning(f"db_count error ({table}): {e}")
+        return None
 
-    # Fetch promoter-created events (no cagematch_id) for fallback dedup
-    # Grouped by (promotion_id, event_date) for fast lookup
-    logger.info("Fetching promoter-created events for dedup...")
-    promoter_events = {}  # (promotion_id, event_date) -> [{id, name}, ...]
-    offset = 0
-    while True:
-        batch = db_get(f"events?select=id,name,event_date,promotion_id,admin_edited&cagematch_id=is.null&not.promotion_id.is.null&limit=1000&offset={offset}")
-        if not batch:
-            break
-        for e in batch:
-            key = (e['promotion_id'], e['event_date'])
-            if key not in promoter_events:
-                promoter_events[key] = []
-            promoter_events[key].append({'id': e['id'], 'name': e['name'], 'admin_edited': e.get('admin_edited', False)})
-        if len(batch) < 1000:
-            break
-        offset += 1000
-    logger.info(f"  {sum(len(v) for v in promoter_events.values())} promoter-created events loaded")
+
+MIRROR_EVENT_COLS = "id,name,event_date,promotion_id,cagematch_id,admin_edited,updated_at"
+
+
+def mirror_put_event(e):
+    """Insert or replace one events row in the local mirror"""
+    state_db().execute(
+        """INSERT OR REPLACE INTO events_mirror (id, name, event_date, promotion_id, cagematch_id, admin_edited, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (str(e['id']), e.get('name'), e.get('event_date'), e.get('promotion_id'),
+         str(e['cagematch_id']) if e.get('cagematch_id') else None,
+         1 if e.get('admin_edited') else 0, e.get('updated_at')),
+    )
+
+
+def mirror_put_promotion(p):
+    state_db().execute(
+        "INSERT OR REPLACE INTO promotions_mirror (id, name, slug, updated_at) VALUES (?, ?, ?, ?)",
+        (str(p['id']), p['name'], p.get('slug'), p.get('updated_at')),
+    )
+
+
+def mirror_event_by_cagematch(cagematch_id):
+    row = state_db().execute(
+        "SELECT id, name, admin_edited FROM events_mirror WHERE cagematch_id = ?", (str(cagematch_id),)
+    ).fetchone()
+    return {'id': row['id'], 'name': row['name'] or '', 'admin_edited': bool(row['admin_edited'])} if row else None
+
+
+def mirror_promoter_events(promotion_id, event_date):
+    """Promoter-created (no cagematch_id) events for a promotion on a date"""
+    rows = state_db().execute(
+        "SELECT id, name, admin_edited FROM events_mirror WHERE promotion_id = ? AND event_date = ? AND cagematch_id IS NULL",
+        (str(promotion_id), event_date),
+    ).fetchall()
+    return [{'id': r['id'], 'name': r['name'] or '', 'admin_edited': bool(r['admin_edited'])} for r in rows]
+
+
+def mirror_meta(key, value=None):
+    """Get (or with value, set) a mirror bookkeeping value"""
+    db = state_db()
+    if value is None:
+        row = db.execute("SELECT value FROM mirror_meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+    db.execute("INSERT OR REPLACE INTO mirror_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+class MirrorUnavailable(Exception):
+    """The server couldn't be read to build the local mirror; loading against it would duplicate events"""
+
+
+def verify_mirror():
+    """Compare the mirror's (id, updated_at) pairs against the server; refetch/drop any differences.
+    Returns False (and changes nothing) if the server's list couldn't be read in full."""
+    db = state_db()
+    rows = fetch_all("events?select=id,updated_at&order=id", strict=True)
+    server_count = db_count("events")
+    if rows is None or server_count is None or len(rows) != server_count:
+        # A partial list would make every row it missed look deleted
+        logger.warning(f"  Mirror verification skipped: server list incomplete "
+                       f"({'read failed' if rows is None else f'{len(rows)} of {server_count} rows'})")
+        return False
+    server = {str(r['id']): r.get('updated_at') for r in rows}
+    local = {r['id']: r['updated_at'] for r in db.execute("SELECT id, updated_at FROM events_mirror")}
+
+    stale = [i for i, u in server.items() if local.get(i) != u]
+    gone = [i for i in local if i not in server]
+    if not stale and not gone:
+        logger.info(f"  Mirror verified ({len(local)} events)")
+        return True
+
+    logger.warning(f"  Mirror mismatch: {len(stale)} stale/missing, {len(gone)} deleted — repairing")
+    fresh = fetch_events(f"select={MIRROR_EVENT_COLS}", stale, strict=True)
+    if fresh is None:
+        logger.warning("  Mirror repair skipped: refetch failed")
+        return False
+    for e in fresh:
+        mirror_put_event(e)
+    db.executemany("DELETE FROM events_mirror WHERE id = ?", [(i,) for i in gone])
+    return True
+
+
+def refresh_mirror():
+    """Bring the local mirror of events/promotions up to date.
+
+    The first run downloads everything; later runs only fetch rows whose
+    updated_at moved past the stored watermark. A cheap row-count check runs
+    every time, and a full id/updated_at comparison every MIRROR_VERIFY_HOURS
+    (or on a count mismatch) catches deletes and anything a delta missed.
+
+    A failed server read never empties the mirror or moves the watermark: a
+    failed delta is retried from the same point next run, and a failed first
+    build raises MirrorUnavailable rather than letting the load run against
+    an empty mirror.
+    """
+    db = state_db()
+    # Overlap the watermark a little so rows committed mid-fetch aren't missed
+    started = (datetime.utcnow() - timedelta(minutes=1)).isoformat()
+    since = mirror_meta('watermark')
+
+    if since is None:
+        logger.info("Building local mirror (first run)...")
+        promo_rows = fetch_all("promotions?select=id,name,slug,updated_at&order=id", strict=True)
+        event_rows = fetch_all(f"events?select={MIRROR_EVENT_COLS}&order=id", strict=True)
+        if promo_rows is None or event_rows is None:
+            raise MirrorUnavailable("couldn't read events/promotions from Supabase to build the local mirror")
+    else:
+        promo_rows = fetch_all(f"promotions?select=id,name,slug,updated_at&updated_at=gt.{since}&order=id", strict=True)
+        event_rows = fetch_all(f"events?select={MIRROR_EVENT_COLS}&updated_at=gt.{since}&order=id", strict=True)
+        if promo_rows is None or event_rows is None:
+            # Keep the old watermark so the next run fetches this delta again
+            logger.warning(f"Mirror delta since {since} failed — using the mirror as is")
+            return
+        logger.info(f"Mirror delta since {since}: {len(promo_rows)} promotions, {len(event_rows)} events")
+
+    for p in promo_rows:
+        mirror_put_promotion(p)
+    for e in event_rows:
+        mirror_put_event(e)
+
+    local_count = db.execute("SELECT COUNT(*) FROM events_mirror").fetchone()[0]
+    server_count = db_count("events")
+    last_verified = mirror_meta('verified_at')
+    if (since is not None and server_count is not None and server_count != local_count) or \
+            (last_verified and datetime.fromisoformat(last_verified) < datetime.now() - timedelta(hours=MIRROR_VERIFY_HOURS)):
+        if verify_mirror():
+            mirror_meta('verified_at', datetime.now().isoformat())
+    elif not last_verified:
+        mirror_meta('verified_at', datetime.now().isoformat())
+
+    mirror_meta('watermark', started)
+    db.commit()
+
+
+def load_sync_index():
+    """Refresh the local mirror and return the promotion lookup load_events dedups against.
+    Event lookups go straight to the mirror's cagematch_id / (promotion_id, event_date) indexes."""
+    refresh_mirror()
+    promos = {r['name'].lower(): {'id': r['id'], 'name': r['name'], 'slug': r['slug']}
+              for r in state_db().execute("SELECT id, name, slug FROM promotions_mirror")}
+    counts = state_db().execute(
+        "SELECT COUNT(cagematch_id), SUM(cagematch_id IS NULL AND promotion_id IS NOT NULL) FROM events_mirror"
+    ).fetchone()
+    logger.info(f"  {len(promos)} promotions, {counts[0]} cagematch-linked events, {counts[1] or 0} promoter-created events")
+    return {'promos': promos}
+
+
+def load_events(events):
+    """Load scraped events (any iterable of ScrapedEvent — a list, a file
+    stream or the crawl itself) into Supabase, creating promotions as needed.
+    Returns the new event IDs (their homepage news comes from publish_news)."""
+    promos = load_sync_index()['promos']
 
     created = skipped = linked = updated = errors = new_promos = 0
     new_event_ids = []
+    tag_labels = rules().tag_labels
+    seen = 0
+
+    for chunk in chunked(events, LOAD_CHUNK):
+        auto_tags = rules().tag_batch(chunk)
+        for event, event_tags in zip(chunk, auto_tags):
+            seen += 1
+            if seen % 100 == 0:
+                logger.info(f"  Loading {seen}...")
+
+            # Find or create ALL promotions (co-promoters) FIRST
+            all_promo_ids = []
+            for pname in event.promotion_names:
+                key = pname.lower()
+                pid = None
+                if key in promos:
+                    pid = promos[key]['id']
+                else:
+                    # Partial match
+                    for k, p in promos.items():
+                        if key in k or k in key:
+                            pid = p['id']
+                            break
+                    if not pid:
+                        # Create new promotion
+                        country = event.country
+                        region = gazetteer().region(country)
+                        slug = re.sub(r'[^a-z0-9-]', '', pname.lower().replace(' ', '-'))
+                        new_data = {"name": pname, "slug": slug, "country": country}
+                        if region:
+                            new_data["region"] = region
+                        new_promo = db_post("promotions", new_data)
+                        if new_promo:
+                            promos[key] = new_promo
+                            mirror_put_promotion(new_promo)
+                            record_change('promotion', new_promo['id'], 'inserted', after=new_data)
+                            pid = new_promo['id']
+                            new_promos += 1
+                            logger.info(f"  New promotion: {pname} ({country})")
+                if pid:
+                    all_promo_ids.append(pid)
+
+            # Primary promotion for backward compat (use first from list)
+            promo_id = all_promo_ids[0] if all_promo_ids else None
+
+            # Check if event already exists
+            db_event = mirror_event_by_cagematch(event.cagematch_id) if event.cagematch_id else None
+            if db_event:
+                note_listing(db_event['id'], event)
+                # Update name if Cagematch has a different name and admin hasn't edited
+                if not db_event['admin_edited'] and event.name and event.name != db_event['name']:
+                    if db_patch("events", f"id=eq.{db_event['id']}", {"name": event.name}):
+                        logger.info(f"  ✏️ Updated name: \"{db_event['name']}\" → \"{event.name}\"")
+                        updated += 1
+                        record_change('event', db_event['id'], 'renamed', {'name': db_event['name']}, {'name': event.name})
+                        state_db().execute("UPDATE events_mirror SET name = ? WHERE id = ?", (event.name, db_event['id']))
+
+                # Update event_promotions for existing events (ensures co-promoters are linked)
+                if all_promo_ids:
+                    for pid in all_promo_ids:
+                        db_post("event_promotions", {
+                            'event_id': db_event['id'],
+                            'promotion_id': pid
+                        }, prefer_header='resolution=ignore-duplicates')
+
+                skipped += 1
+                continue
 
-    for i, event in enumerate(events):
-        if (i + 1) % 100 == 0:
-            logger.info(f"  Loading {i+1}/{len(events)}...")
-
-        # Find or create ALL promotions (co-promoters) FIRST
-        all_promo_ids = []
-        for pname in event.get('promotion_names', []):
-            key = pname.lower()
-            pid = None
-            if key in promos:
-                pid = promos[key]['id']
-            else:
-                # Partial match
-                for k, p in promos.items():
-                    if key in k or k in key:
-                        pid = p['id']
-                        break
-                if not pid:
-                    # Create new promotion
-                    country = event.get('country', 'USA')
-                    region = COUNTRY_TO_REGION.get(country, 'International')
-                    slug = re.sub(r'[^a-z0-9-]', '', pname.lower().replace(' ', '-'))
-                    new_data = {"name": pname, "slug": slug, "country": country}
-                    if region:
-                        new_data["region"] = region
-                    new_promo = db_post("promotions", new_data)
-                    if new_promo:
-                        promos[key] = new_promo
-                        pid = new_promo['id']
-                        new_promos += 1
-                        logger.info(f"  New promotion: {pname} ({country})")
-            if pid:
-                all_promo_ids.append(pid)
-
-        # Primary promotion for backward compat (use first from list)
-        promo_id = all_promo_ids[0] if all_promo_ids else None
-
-        # Check if event already exists
-        if event.get('cagematch_id') and str(event['cagematch_id']) in existing:
-            db_event = existing[str(event['cagematch_id'])]
-            # Update name if Cagematch has a different name and admin hasn't edited
-            if not db_event['admin_edited'] and event.get('name') and event['name'] != db_event['name']:
-                if db_patch("events", f"id=eq.{db_event['id']}", {"name": event['name']}):
-                    logger.info(f"  ✏️ Updated name: \"{db_event['name']}\" → \"{event['name']}\"")
-                    updated += 1
-
-            # Update event_promotions for existing events (ensures co-promoters are linked)
-            if all_promo_ids:
-                for pid in all_promo_ids:
-                    db_post("event_promotions", {
-                        'event_id': db_event['id'],
-                        'promotion_id': pid
-                    }, prefer_header='resolution=ignore-duplicates')
-
-            skipped += 1
-            continue
-
-        # Fallback dedup: check for promoter-created event with same promotion + date + similar name
-        if promo_id and event.get('event_date') and event.get('cagematch_id'):
-            dedup_key = (promo_id, event['event_date'])
-            match_found = False
-            if dedup_key in promoter_events:
-                for pe in promoter_events[dedup_key]:
-                    if names_match(event['name'], pe['name']):
+            # Fallback dedup: check for promoter-created event with same promotion + date + similar name
+            if promo_id and event.event_date and event.cagematch_id:
+                match_found = False
+                for pe in mirror_promoter_events(promo_id, event.event_date):
+                    if names_match(event.name, pe['name']):
                         # Skip events that have been edited by an admin/promoter
                         if pe.get('admin_edited'):
                             logger.info(f"  🔒 Skipping admin-edited: {pe['name']}")
@@ -487,18 +1763,22 @@ def load_events(events):
                             break
                         # Link existing promoter event to Cagematch
                         patch_data = {
-                            "cagematch_id": event['cagematch_id'],
-                            "source_url": event.get('cagematch_url'),
+                            "cagematch_id": event.cagematch_id,
+                            "source_url": event.cagematch_url,
                             "source_name": "cagematch",
                         }
-                        # Auto-tag Vegas Weekend
-                        link_city = (event.get('city') or '').lower().strip()
-                        link_date = event.get('event_date', '')
-                        if link_city in ('las vegas', 'north las vegas', 'henderson') and '2026-04-15' <= link_date <= '2026-04-20':
-                            patch_data['vegas_weekend'] = True
-                            logger.info(f"  🎰 Auto-tagged Vegas Weekend: {pe['name']}")
-                        db_patch("events", f"id=eq.{pe['id']}", patch_data)
-                        existing.add(str(event['cagematch_id']))
+                        # Auto-tags (e.g. Vegas Weekend) from sync_rules.json
+                        for column in event_tags:
+                            patch_data[column] = True
+                            logger.info(f"  🎰 Auto-tagged {tag_labels[column]}: {pe['name']}")
+                        if not db_patch("events", f"id=eq.{pe['id']}", patch_data):
+                            # Mirror left unlinked, so the next run finds this event and tries again
+                            logger.warning(f"  Couldn't link {pe['name']} to CM#{event.cagematch_id}")
+                            errors += 1
+                            match_found = True
+                            break
+                        record_change('event', pe['id'], 'linked', {'cagematch_id': pe.get('cagematch_id')}, patch_data)
+                        state_db().execute("UPDATE events_mirror SET cagematch_id = ? WHERE id = ?", (str(event.cagematch_id), pe['id']))
 
                         # Write co-promoter entries to event_promotions junction table
                         if all_promo_ids:
@@ -510,78 +1790,61 @@ def load_events(events):
                             if len(all_promo_ids) > 1:
                                 logger.info(f"  🤝 Linked co-promoted event ({len(all_promo_ids)} promotions)")
 
-                        # Remove from promoter_events so it won't match again
-                        promoter_events[dedup_key].remove(pe)
                         linked += 1
-                        logger.info(f"  🔗 Linked to existing: {pe['name']} ← CM#{event['cagematch_id']}")
+                        logger.info(f"  🔗 Linked to existing: {pe['name']} ← CM#{event.cagematch_id}")
                         match_found = True
                         break
-            if match_found:
-                continue
-
-        # Insert event
-        event_data = {
-            "name": event['name'],
-            "event_date": event['event_date'],
-            "city": event.get('city'),
-            "state": event.get('state'),
-            "country": event.get('country', 'USA'),
-            "promotion_id": promo_id,
-            "cagematch_id": event.get('cagematch_id'),
-            "source_url": event.get('cagematch_url'),
-            "source_name": "cagematch",
-            "status": "upcoming",
-        }
+                if match_found:
+                    continue
 
-        # Auto-tag Vegas Weekend events (Las Vegas, April 15-20, 2026)
-        evt_city = (event.get('city') or '').lower().strip()
-        evt_date = event.get('event_date', '')
-        if evt_city in ('las vegas', 'north las vegas', 'henderson') and '2026-04-15' <= evt_date <= '2026-04-20':
-            event_data['vegas_weekend'] = True
-            logger.info(f"  🎰 Auto-tagged Vegas Weekend: {event['name']} ({evt_date})")
-
-        result = db_post("events", event_data)
-        if result:
-            created += 1
-            event_id = result.get('id')
-            new_event_ids.append(event_id)
-            if event.get('cagematch_id'):
-                existing[str(event['cagematch_id'])] = {
-                    'id': event_id,
-                    'name': event.get('name', ''),
-                    'admin_edited': False,
-                }
-
-            # Write co-promoter entries to event_promotions junction table
-            if all_promo_ids:
-                co_promo_count = 0
-                for pid in all_promo_ids:
-                    if db_post("event_promotions", {
-                        'event_id': event_id,
-                        'promotion_id': pid
-                    }, prefer_header='resolution=ignore-duplicates'):
-                        co_promo_count += 1
-                if len(all_promo_ids) > 1:
-                    logger.info(f"  🤝 Co-promoted event ({len(all_promo_ids)} promotions): {event['name']}")
-
-            # Create homepage news item for new event
-            promo_name = event.get('promotion_name')
-            news_title = f"New show: {event['name']}"
-            if promo_name:
-                news_title = f"{promo_name} announces {event['name']}"
-            db_post("homepage_news", {
-                "type": "new_event",
-                "title": news_title,
-                "link_url": f"/events/{event_id}",
-                "related_event_id": event_id,
-                "related_promotion_id": promo_id,
-                "is_auto": True,
-                "sort_order": 1,
-                "expires_at": (datetime.now() + timedelta(days=10)).isoformat(),
-            })
-        else:
-            errors += 1
+            # Insert event
+            event_data = {
+                "name": event.name,
+                "event_date": event.event_date,
+                "city": event.city,
+                "state": event.state,
+                "country": event.country,
+                "promotion_id": promo_id,
+                "cagematch_id": event.cagematch_id,
+                "source_url": event.cagematch_url,
+                "source_name": "cagematch",
+                "status": "upcoming",
+            }
+
+            # Auto-tags (e.g. Vegas Weekend) from sync_rules.json
+            for column in event_tags:
+                event_data[column] = True
+                logger.info(f"  🎰 Auto-tagged {tag_labels[column]}: {event.name} ({event.event_date})")
+
+            # Approximate pin straight away; geocode_events upgrades it once a venue is known
+            lat, lng = city_coordinates(event_data['city'], event_data['state'], event_data['country'])
+            if lat is not None:
+                event_data.update(latitude=lat, longitude=lng, geo_precision='city')
+
+            result = db_post("events", event_data)
+            if result:
+                created += 1
+                event_id = result.get('id')
+                new_event_ids.append(event_id)
+                note_listing(event_id, event)
+                record_change('event', event_id, 'inserted', after=event_data)
+                mirror_put_event({**event_data, 'id': event_id})
+
+                # Write co-promoter entries to event_promotions junction table
+                if all_promo_ids:
+                    co_promo_count = 0
+                    for pid in all_promo_ids:
+                        if db_post("event_promotions", {
+                            'event_id': event_id,
+                            'promotion_id': pid
+                        }, prefer_header='resolution=ignore-duplicates'):
+                            co_promo_count += 1
+                    if len(all_promo_ids) > 1:
+                        logger.info(f"  🤝 Co-promoted event ({len(all_promo_ids)} promotions): {event.name}")
+            else:
+                errors += 1
 
+    state_db().commit()
     logger.info(f"Load complete: {created} created, {linked} linked, {updated} updated, {skipped} skipped, {errors} errors, {new_promos} new promotions")
     return new_event_ids
 
@@ -590,90 +1853,515 @@ def load_events(events):
 # STEP 3: SCRAPE VENUE DETAILS
 # ============================================
 
-def scrape_event_detail(source_url):
-    """Scrape venue, address, time, ticket from a Cagematch event page"""
-    details = {}
+WRESTLER_LINK = re.compile(r'[?&]id=2&nr=(\d+)')
+TITLE_LINK = re.compile(r'[?&]id=5&nr=\d+')
+# Text between the sides of a match: "A vs. B", "A & B defeat C & D"
+CARD_SEPARATOR = re.compile(r'\b(vs\.|defeats?)(?=\s)', re.I)
+
+
+def card_wrestlers(element):
+    """The linked wrestlers in a page element, in order, once each"""
+    seen = set()
+    wrestlers = []
+    for link in element.find_all('a', href=True):
+        m = WRESTLER_LINK.search(link['href'])
+        if m and m.group(1) not in seen and link.get_text(strip=True):
+            seen.add(m.group(1))
+            wrestlers.append(CardWrestler(cagematch_id=m.group(1), name=link.get_text(strip=True)))
+    return wrestlers
+
+
+def parse_match(match_div):
+    """One div.Match of an event page -> CardMatch, sides numbered by the vs./defeats separators"""
+    type_div = match_div.find('div', class_='MatchType')
+    body = match_div.find('div', class_='MatchResults') or match_div.find('div', class_='MatchCard')
+    if not body:
+        return None
 
-    if '&page=' in source_url:
-        source_url = source_url.split('&page=')[0]
+    match = CardMatch()
+    if type_div:
+        match.match_type = ' '.join(type_div.get_text().split()) or None
+        title_link = type_div.find('a', href=TITLE_LINK)
+        if title_link:
+            match.championship_name = title_link.get_text(strip=True)
+        match.is_title_match = bool(title_link) or 'title' in (match.match_type or '').lower()
+
+    team = 1
+    decided = False
+    seen = set()
+    for node in body.descendants:
+        if isinstance(node, str):
+            if node.parent.name != 'a':
+                for sep in CARD_SEPARATOR.findall(node):
+                    team += 1
+                    decided = decided or sep.lower().startswith('defeat')
+        elif node.name == 'a':
+            m = WRESTLER_LINK.search(node.get('href', ''))
+            if m and m.group(1) not in seen and node.get_text(strip=True):
+                seen.add(m.group(1))
+                match.participants.append(CardWrestler(cagematch_id=m.group(1), name=node.get_text(strip=True), team_number=team))
+
+    text = ' '.join(body.get_text().split())
+    if decided:
+        match.result_summary = text
+        for p in match.participants:
+            p.is_winner = p.team_number == 1
+    else:
+        match.match_title = text
+    return match
+
+
+def parse_event_page(html):
+    """Everything we keep from a Cagematch event page: venue, address, times, ticket,
+    the match card and the announced talent"""
+    details = EventDetail()
+    soup = parse_html(html)
+
+    info_box = soup.find('div', class_='InformationBoxTable')
+    if info_box:
+        for row in info_box.find_all('div', class_='InformationBoxRow'):
+            title_div = row.find('div', class_='InformationBoxTitle')
+            content_div = row.find('div', class_='InformationBoxContents')
+            if not title_div or not content_div:
+                continue
 
-    try:
-        time.sleep(1.5)
-        resp = requests.get(source_url, headers=SCRAPE_HEADERS, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        info_box = soup.find('div', class_='InformationBoxTable')
-        if info_box:
-            for row in info_box.find_all('div', class_='InformationBoxRow'):
-                title_div = row.find('div', class_='InformationBoxTitle')
-                content_div = row.find('div', class_='InformationBoxContents')
-                if not title_div or not content_div:
-                    continue
+            title = title_div.get_text(strip=True).lower()
+            content = content_div.get_text(strip=True)
+
+            if 'arena' in title:
+                link = content_div.find('a')
+                details.venue_name = link.get_text(strip=True) if link else content
+            elif 'location' in title or 'address' in title:
+                details.venue_address = content
+            elif 'bell' in title or 'start' in title:
+                details.event_time = content
+            elif 'door' in title:
+                details.doors_time = content
+
+    # Ticket links
+    for link in soup.find_all('a', href=True):
+        href = link.get('href', '').lower()
+        text = link.get_text(strip=True).lower()
+        if rules().is_ticket_url(href) and link['href'].startswith('http'):
+            details.ticket_url = link['href']
+            break
+        elif 'ticket' in text and link['href'].startswith('http'):
+            details.ticket_url = link['href']
+            break
+
+    # Match card, then everyone on it plus any other workers the page lists
+    for match_div in soup.find_all('div', class_='Match'):
+        match = parse_match(match_div)
+        if match:
+            details.matches.append(match)
+    talent = {p.cagematch_id: CardWrestler(cagematch_id=p.cagematch_id, name=p.name)
+              for m in details.matches for p in m.participants}
+    for block in soup.find_all('div', class_='Comments'):
+        if block.get_text(strip=True).lower().startswith('all workers'):
+            for w in card_wrestlers(block):
+                talent.setdefault(w.cagematch_id, w)
+    details.talent = list(talent.values())
 
-                title = title_div.get_text(strip=True).lower()
-                content = content_div.get_text(strip=True)
+    return details
 
-                if 'arena' in title:
-                    link = content_div.find('a')
-                    details['venue_name'] = link.get_text(strip=True) if link else content
-                elif 'location' in title or 'address' in title:
-                    details['venue_address'] = content
-                elif 'bell' in title or 'start' in title:
-                    details['event_time'] = content
-                elif 'door' in title:
-                    details['doors_time'] = content
 
-        # Ticket links
-        for link in soup.find_all('a', href=True):
-            href = link.get('href', '').lower()
-            text = link.get_text(strip=True).lower()
-            if any(p in href for p in TICKET_PLATFORMS) and link['href'].startswith('http'):
-                details['ticket_url'] = link['href']
-                break
-            elif 'ticket' in text and link['href'].startswith('http'):
-                details['ticket_url'] = link['href']
-                break
+def compress_page(html):
+    return zlib.compress(html.encode('utf-8'))
+
+
+def store_event_page(event_id, source_url, body):
+    """Keep an event page (compress_page() bytes) for `reprocess`"""
+    state_db().execute(
+        """INSERT INTO event_pages (event_id, source_url, fetched_at, body) VALUES (?, ?, ?, ?)
+           ON CONFLICT (event_id) DO UPDATE SET
+             source_url = excluded.source_url, fetched_at = excluded.fetched_at, body = excluded.body""",
+        (str(event_id), source_url, datetime.now().isoformat(), body),
+    )
+    state_db().commit()
+
+
+def stored_event_pages(event_ids=None):
+    """(event_id, html) for the stored event pages (optionally only the given IDs)"""
+    db = state_db()
+    if event_ids is None:
+        keys = [r['event_id'] for r in db.execute("SELECT event_id FROM event_pages ORDER BY event_id")]
+    else:
+        keys = [str(i) for i in event_ids]
+    for event_id in keys:
+        row = db.execute("SELECT body FROM event_pages WHERE event_id = ?", (event_id,)).fetchone()
+        if row:
+            yield event_id, zlib.decompress(row['body']).decode('utf-8')
+
+
+def event_page_url(source_url):
+    """The event's overview page (where the info box and card are)"""
+    return source_url.split('&page=')[0] if '&page=' in source_url else source_url
+
 
+def scrape_event_detail(source_url, event_id=None):
+    """Fetch a Cagematch event page and parse it into an EventDetail (venue, times,
+    ticket, card, talent), keeping the page body for `reprocess` if event_id is given.
+    Returns None if the page couldn't be fetched (as opposed to an empty EventDetail for a page with no details)."""
+    source_url = event_page_url(source_url)
+
+    try:
+        resp = cagematch_get(source_url)
+        if event_id is not None:
+            store_event_page(event_id, source_url, compress_page(resp.text))
+        return parse_event_page(resp.text)
+    except CagematchUnavailable:
+        raise
     except Exception as e:
         logger.warning(f"Detail scrape error for {source_url}: {e}")
+        return None
 
-    return details
 
+def venue_detail_candidates(event_ids=None):
+    """Events missing venue details (optionally only the given IDs) that are due for a scrape"""
+    all_events = fetch_events(f"select=id,name,source_url,{','.join(REFRESH_FIELDS)},admin_edited&source_url=not.is.null&venue_name=is.null&admin_edited=not.eq.true", event_ids)
+
+    metrics['queues']['details'] = len(all_events)
+    if not all_events:
+        logger.info("All events have venue details")
+        return []
+
+    due_events = filter_due('details', all_events, input_key=lambda e: e.get('source_url'))
+    metrics['queues']['details_due'] = len(due_events)
+    if len(due_events) < len(all_events):
+        logger.info(f"  {len(all_events) - len(due_events)} events with no venue on Cagematch not due for retry")
+    return [e for e in due_events if e.get('source_url')]
+
+
+def apply_event_detail(event, details):
+    """Write a scraped EventDetail to its event; True if the row was updated"""
+    note_detail_scrape(event['id'])
+    found = details.fields()
+    updated = bool(found) and db_patch("events", f"id=eq.{event['id']}", found)
+    if updated:
+        record_change('event', event['id'], 'enriched', {k: event.get(k) for k in found}, found)
+    # Only a venue name takes the event out of the candidate set
+    record_attempt('details', event['id'], bool(details.venue_name), input_key=event['source_url'])
+    return updated
+
+
+def slugify(text):
+    return re.sub(r'-+', '-', re.sub(r'\s+', '-', re.sub(r'[^\w\s-]', '', text.lower()))).strip('-')
+
+
+_wrestler_cm_cache = {}   # Cagematch worker ID -> wrestlers row
+_wrestler_cm_lock = threading.Lock()
+
+
+def resolve_wrestlers(people):
+    """Wrestler rows for {cagematch_id: name}, as scrape-all-champions.mjs does it:
+    by Cagematch ID, else an exact name match (which gets the ID linked), else a
+    new wrestler. Returns {cagematch_id: row} for the ones that could be resolved
+    (a failed lookup leaves its IDs out, rather than creating them again)."""
+    # One caller at a time: the details and refresh stages would otherwise both
+    # create a wrestler new to both, the second as a {slug}-{id} duplicate
+    with _wrestler_cm_lock:
+        return _resolve_wrestlers(people)
+
+
+def _resolve_wrestlers(people):
+    found = {k: _wrestler_cm_cache[k] for k in people if k in _wrestler_cm_cache}
+    missing = [k for k in people if k not in found]
+    # A failed lookup must not read as "no such wrestler": that would create a duplicate
+    unknown = set()
+    for i in range(0, len(missing), 200):
+        chunk = missing[i:i + 200]
+        rows = db_get(f"wrestlers?select=id,name,slug,cagematch_id&cagematch_id=in.({','.join(chunk)})", strict=True)
+        if rows is None:
+            unknown.update(chunk)
+            continue
+        for w in rows:
+            found[str(w['cagematch_id'])] = w
+
+    for cm_id, name in people.items():
+        if cm_id in found or cm_id in unknown:
+            continue
+        rows = db_get(f"wrestlers?select=id,name,slug,cagematch_id&name=ilike.{quote(name)}&limit=2", strict=True)
+        if rows is None:
+            continue   # Left unresolved for this batch
+        by_name = [w for w in rows if not w.get('cagematch_id')]
+        if len(by_name) == 1:
+            w = by_name[0]
+            db_patch("wrestlers", f"id=eq.{w['id']}", {"cagematch_id": int(cm_id)})
+        else:
+            slug = slugify(name) or f"wrestler-{cm_id}"
+            row = {"name": name, "slug": slug, "cagematch_id": int(cm_id)}
+            # Slug taken by a namesake: disambiguate with the Cagematch ID
+            w = db_post("wrestlers", row) or db_post("wrestlers", {**row, "slug": f"{slug}-{cm_id}"})
+            if not w:
+                logger.warning(f"  Couldn't create wrestler {name} (Cagematch {cm_id})")
+                continue
+            logger.info(f"  + New wrestler: {name}")
+        found[cm_id] = w
+
+    _wrestler_cm_cache.update(found)
+    return found
+
+
+def card_hash(matches):
+    return hashlib.sha1(json.dumps(matches, default=json_default, sort_keys=True).encode()).hexdigest()
+
+
+def apply_event_cards(details_by_event):
+    """Bulk-write match cards and announced talent for {event_id: EventDetail}.
+
+    A card is (re)written only when it changed since we last wrote it, and
+    never over matches added on HotTag. Talent is only ever added, after any
+    already announced. Returns the number of cards written."""
+    details_by_event = {str(k): d for k, d in details_by_event.items() if d.matches or d.talent}
+    if not details_by_event:
+        return 0
+    people = {w.cagematch_id: w.name for d in details_by_event.values()
+              for w in d.talent + [p for m in d.matches for p in m.participants]}
+    wrestlers = resolve_wrestlers(people)
+
+    db = state_db()
+    ids = list(details_by_event)
+    id_list = ','.join(ids)
+    placeholders = ','.join('?' * len(ids))
+    written = {r['event_id']: r for r in db.execute(f"SELECT * FROM event_cards WHERE event_id IN ({placeholders})", ids)}
+    server_matches = fetch_all(f"event_matches?select=id,event_id&event_id=in.({id_list})", strict=True)
+    if server_matches is None:
+        # Without the current matches we can't tell ours from HotTag's, or replace them
+        logger.warning(f"  Match cards skipped for {len(ids)} events: couldn't read their current matches")
+        return 0
+    on_server = {}
+    for m in server_matches:
+        on_server.setdefault(str(m['event_id']), set()).add(str(m['id']))
+
+    # Cards to (re)write, once our own previous matches for them are gone
+    replace = []
+    for event_id, d in details_by_event.items():
+        if not d.matches:
+            continue
+        prev = written.get(event_id)
+        digest = card_hash(d.matches)
+        if prev and prev['card_hash'] == digest:
+            continue
+        ours = set(json.loads(prev['match_ids'])) if prev else set()
+        current = on_server.get(event_id, set())
+        if current - ours:
+            continue  # Card is (also) managed on HotTag
+        if current:
+            stale = ','.join(sorted(current))
+            if not (db_delete("match_participants", f"match_id=in.({stale})") and db_delete("event_matches", f"id=in.({stale})")):
+                # event_cards still lists them as ours, so the next run retries the delete
+                logger.warning(f"  Match card for event {event_id} not replaced: couldn't delete its previous matches")
+                continue
+        replace.append((event_id, digest))
+
+    match_rows = []
+    card_matches = []
+    for event_id, _ in replace:
+        for order, m in enumerate(details_by_event[event_id].matches, 1):
+            match_rows.append({
+                "event_id": event_id, "match_title": m.match_title, "match_type": m.match_type,
+                "match_order": order, "is_title_match": m.is_title_match,
+                "championship_name": m.championship_name, "result_summary": m.result_summary,
+            })
+            card_matches.append((event_id, m))
+    created = db_post_many("event_matches", match_rows)
+    if len(created) != len(match_rows):
+        replace = []  # Insert failed; leave event_cards alone so the next run retries
+    else:
+        participant_rows = []
+        match_ids = {}
+        for row, (event_id, m) in zip(created, card_matches):
+            match_ids.setdefault(event_id, []).append(str(row['id']))
+            for order, p in enumerate(m.participants, 1):
+                w = wrestlers.get(p.cagematch_id)
+                if w:
+                    participant_rows.append({"match_id": row['id'], "wrestler_id": w['id'], "team_number": p.team_number,
+                                             "is_winner": p.is_winner, "entrance_order": order})
+        db_post_many("match_participants", participant_rows)
+        for event_id, digest in replace:
+            record_change('event', event_id, 'card', after={'matches': len(match_ids.get(event_id, [])),
+                                                           'participants': sum(len(m.participants) for m in details_by_event[event_id].matches)})
+        with db.lock:
+            db.executemany(
+                """INSERT INTO event_cards (event_id, card_hash, match_ids) VALUES (?, ?, ?)
+                   ON CONFLICT (event_id) DO UPDATE SET card_hash = excluded.card_hash, match_ids = excluded.match_ids""",
+                [(event_id, digest, json.dumps(match_ids.get(event_id, []))) for event_id, digest in replace],
+            )
+            db.commit()
+
+    # Announced talent: everyone on the page, appended after what's already listed
+    existing_talent = fetch_all(f"event_announced_talent?select=event_id,wrestler_id,sort_order&event_id=in.({id_list})", strict=True)
+    if existing_talent is None:
+        logger.warning(f"  Announced talent skipped for {len(ids)} events: couldn't read what's already listed")
+        return len(replace)
+    announced = {}
+    for t in existing_talent:
+        listed, top = announced.get(str(t['event_id']), (set(), -1))
+        listed.add(str(t['wrestler_id']))
+        announced[str(t['event_id'])] = (listed, max(top, t['sort_order'] if t['sort_order'] is not None else -1))
+    talent_rows = []
+    for event_id, d in details_by_event.items():
+        listed, top = announced.get(event_id, (set(), -1))
+        for w in d.talent:
+            row = wrestlers.get(w.cagematch_id)
+            if row and str(row['id']) not in listed:
+                listed.add(str(row['id']))
+                top += 1
+                talent_rows.append({"event_id": event_id, "wrestler_id": row['id'], "sort_order": top, "self_announced": False})
+    db_post_many("event_announced_talent", talent_rows, on_conflict="event_id,wrestler_id")
+
+    return len(replace)
+
+
+def apply_cards_in_batches(details_by_event):
+    """apply_event_cards over CARD_BATCH events at a time; returns the cards written"""
+    written = 0
+    for chunk in chunked(details_by_event.items(), CARD_BATCH):
+        written += apply_event_cards(dict(chunk))
+    if written:
+        logger.info(f"Match cards written: {written}")
+    return written
+
+
+def fetch_venue_details(event_ids=None):
+    """Scrape venue details (and card/talent) for events that are missing them
+    (optionally only the given IDs). Returns {event_id: EventDetail} for the events that were updated."""
+    results = {}
+    scraped = {}
+    due_events = venue_detail_candidates(event_ids)
+    if not due_events:
+        return results
+
+    logger.info(f"Fetching venue details for {len(due_events)} events...")
+
+    for i, event in enumerate(due_events):
+        if (i + 1) % 25 == 0:
+            logger.info(f"  Detail scraping {i+1}/{len(due_events)}...")
+
+        try:
+            details = scrape_event_detail(event['source_url'], event['id'])
+        except CagematchUnavailable as e:
+            logger.error(f"Venue details stopped: {e}")
+            break
+        if details is None:
+            continue  # Fetch failed — try again next run, don't count it as empty
+        scraped[event['id']] = details
+        if apply_event_detail(event, details):
+            results[event['id']] = details
+
+    logger.info(f"Venue details updated: {len(results)}/{len(due_events)}")
+    apply_cards_in_batches(scraped)
+    logger.info(cagematch_rate.summary())
+    return results
+
+
+def refresh_priority(event, refresh, now):
+    """Score an upcoming event for a detail re-scrape: soon + stale + listing changed scores highest.
+    Returns None if the page was scraped too recently to bother."""
+    days_until = max((datetime.strptime(event['event_date'], "%Y-%m-%d") - now).days, 0)
+    urgency = 1 / (1 + days_until / 7)
+
+    scraped_at = refresh['detail_scraped_at'] if refresh else None
+    changed_at = refresh['listing_changed_at'] if refresh else None
+    listing_changed = bool(changed_at and (not scraped_at or changed_at > scraped_at))
+
+    if scraped_at:
+        age_hours = (now - datetime.fromisoformat(scraped_at)).total_seconds() / 3600
+        if age_hours < REFRESH_MIN_GAP_HOURS and not listing_changed:
+            return None
+        staleness = min(age_hours / REFRESH_STALE_HOURS, 3.0)
+    else:
+        staleness = 3.0  # Scraped before we kept track
+
+    return staleness * (0.25 + urgency) + (2.0 if listing_changed else 0.0)
+
+
+def refresh_event_details(budget=REFRESH_BUDGET):
+    """Re-scrape detail pages of already-enriched upcoming events, highest priority first,
+    and patch only the fields that changed"""
+    if budget <= 0:
+        return
 
-def fetch_venue_details():
-    """Scrape venue details for events that are missing them"""
-    all_events = []
+    fields = ','.join(REFRESH_FIELDS)
+    today = datetime.now().strftime("%Y-%m-%d")
+    candidates = []
     offset = 0
     while True:
-        batch = db_get(f"events?select=id,name,source_url,venue_name,admin_edited&source_url=not.is.null&venue_name=is.null&admin_edited=not.eq.true&limit=500&offset={offset}")
+        batch = db_get(f"events?select=id,name,event_date,source_url,{fields}&source_url=not.is.null&venue_name=not.is.null&event_date=gte.{today}&admin_edited=not.eq.true&limit=1000&offset={offset}")
         if not batch:
             break
-        all_events.extend(batch)
-        if len(batch) < 500:
+        candidates.extend(batch)
+        if len(batch) < 1000:
             break
-        offset += 500
+        offset += 1000
 
-    if not all_events:
-        logger.info("All events have venue details")
+    refresh = {r['event_id']: r for r in state_db().execute("SELECT * FROM event_refresh").fetchall()}
+    now = datetime.now()
+    scored = []
+    for e in candidates:
+        score = refresh_priority(e, refresh.get(str(e['id'])), now)
+        if score is not None:
+            scored.append((score, e))
+    scored.sort(key=lambda x: -x[0])
+    picked = scored[:budget]
+    metrics['queues']['refresh_candidates'] = len(scored)
+
+    if not picked:
+        logger.info("No event pages due for refresh")
         return
 
-    logger.info(f"Fetching venue details for {len(all_events)} events...")
-    updated = 0
-
-    for i, event in enumerate(all_events):
-        if not event.get('source_url'):
+    logger.info(f"Refreshing {len(picked)} of {len(candidates)} upcoming event pages (budget {budget})...")
+    changed = 0
+    scraped = {}
+    for score, e in picked:
+        try:
+            details = scrape_event_detail(e['source_url'], e['id'])
+        except CagematchUnavailable as err:
+            logger.error(f"Refresh stopped: {err}")
+            break
+        if details is None:
             continue
+        note_detail_scrape(e['id'])
+        scraped[e['id']] = details
+        if patch_detail_changes(e, details):
+            changed += 1
+
+    logger.info(f"Refresh complete: {changed}/{len(picked)} events changed")
+    apply_cards_in_batches(scraped)
+
+
+def patch_detail_changes(event, details):
+    """Patch the detail fields that differ from the event row; True if any did"""
+    # A field missing from the page doesn't clear what we already have
+    diff = {k: v for k, v in details.fields().items() if v and v != event.get(k)}
+    if diff and db_patch("events", f"id=eq.{event['id']}", diff):
+        logger.info(f"  🔄 {event['name']} ({event['event_date']}): {', '.join(diff)}")
+        record_change('event', event['id'], 'enriched', {k: event.get(k) for k in diff}, diff)
+        return True
+    return False
 
-        if (i + 1) % 25 == 0:
-            logger.info(f"  Detail scraping {i+1}/{len(all_events)}...")
-
-        details = scrape_event_detail(event['source_url'])
-        if details:
-            if db_patch("events", f"id=eq.{event['id']}", details):
-                updated += 1
 
-    logger.info(f"Venue details updated: {updated}/{len(all_events)}")
+def reprocess_event_pages(event_ids=None):
+    """Re-parse stored event pages (no Cagematch requests) and apply what they
+    say: changed detail fields, match cards and announced talent. For when the
+    parser learns something new. Returns the number of pages processed."""
+    fields = ','.join(REFRESH_FIELDS)
+    processed = changed = 0
+    for chunk in chunked(stored_event_pages(event_ids), CARD_BATCH):
+        events = {str(e['id']): e for e in fetch_events(
+            f"select=id,name,event_date,{fields}&admin_edited=not.eq.true", [event_id for event_id, _ in chunk])}
+        parsed = {}
+        for event_id, html in chunk:
+            e = events.get(event_id)
+            if not e:
+                continue  # Deleted or hand-edited since
+            parsed[event_id] = parse_event_page(html)
+            if patch_detail_changes(e, parsed[event_id]):
+                changed += 1
+        apply_cards_in_batches(parsed)
+        processed += len(parsed)
+    logger.info(f"Reprocessed {processed} stored event pages, {changed} events changed")
+    return processed
 
 
 # ============================================
@@ -682,80 +2370,160 @@ def fetch_venue_details():
 
 def geocode(venue, city, state, country):
     """Get lat/lng from Google Geocoding API"""
-    if not GOOGLE_API_KEY:
-        return None, None
+    lat, lng, _ = geocode_query(', '.join(filter(None, [venue, city, state, country])))
+    return lat, lng
+
+
+def geocode_address(e):
+    """Address string we geocode an event row by"""
+    # Try venue_address first (more specific), fall back to venue_name
+    venue = e.get('venue_address') or e.get('venue_name')
+    return ', '.join(filter(None, [venue, e.get('city'), e.get('state'), e.get('country', 'USA')]))
 
-    address = ', '.join(filter(None, [venue, city, state, country]))
-    if not address:
-        return None, None
+
+def geocode_query(address):
+    """Get (lat, lng, status) for a free-form address from Google Geocoding API.
+    status is Google's status string, or None if the request itself failed."""
+    load_config()
+    if not GOOGLE_API_KEY or not address:
+        return None, None, None
 
     try:
-        resp = requests.get('https://maps.googleapis.com/maps/api/geocode/json', params={
+        resp = http_session('geo').get('https://maps.googleapis.com/maps/api/geocode/json', params={
             'address': address, 'key': GOOGLE_API_KEY
         })
         data = resp.json()
         if data['status'] == 'OK' and data['results']:
             loc = data['results'][0]['geometry']['location']
-            return loc['lat'], loc['lng']
+            return loc['lat'], loc['lng'], data['status']
+        return None, None, data['status']
     except Exception as e:
         logger.warning(f"Geocode error for '{address}': {e}")
 
-    return None, None
+    return None, None, None
 
 
-def geocode_events():
-    """Geocode events that are missing coordinates"""
-    if not GOOGLE_API_KEY:
-        logger.warning("No GOOGLE_MAPS_API_KEY — skipping geocoding")
-        return
+def geocode_candidates(event_ids=None):
+    """Events missing coordinates or with only city-level ones (optionally only the given IDs)"""
+    all_events = fetch_events("select=id,name,venue_name,venue_address,city,state,country,admin_edited,latitude,longitude,geo_precision&or=(latitude.is.null,longitude.is.null,geo_precision.eq.city)&admin_edited=not.eq.true", event_ids)
+    metrics['queues']['geocode'] = len(all_events)
+    if not all_events:
+        logger.info("All events have venue-level coordinates")
+    return all_events
 
-    all_events = []
-    offset = 0
-    while True:
-        batch = db_get(f"events?select=id,name,venue_name,venue_address,city,state,country,admin_edited&or=(latitude.is.null,longitude.is.null)&admin_edited=not.eq.true&limit=500&offset={offset}")
-        if not batch:
-            break
-        all_events.extend(batch)
-        if len(batch) < 500:
-            break
-        offset += 500
 
+def pin_cities(events):
+    """Offline city pins for the events with no coordinates at all.
+    Returns {event_id: coordinates} for the events pinned."""
+    results = {}
+    for e in events:
+        if e.get('geo_precision') == 'city':
+            continue
+        lat, lng = city_coordinates(e.get('city'), e.get('state'), e.get('country'))
+        if lat is not None:
+            coords = {'latitude': lat, 'longitude': lng, 'geo_precision': 'city'}
+            if db_patch("events", f"id=eq.{e['id']}", coords):
+                results[e['id']] = coords
+                record_change('event', e['id'], 'geocoded', {k: e.get(k) for k in coords}, coords)
+                e['geo_precision'] = 'city'
+    if results:
+        logger.info(f"  📍 {len(results)} events pinned to their city (offline)")
+    return results
+
+
+def venue_geocode_due(events):
+    """The events worth a paid lookup: those with a venue, past their retry backoff"""
+    # Paid lookups only where there's a venue to find
+    venue_events = [e for e in events if e.get('venue_address') or e.get('venue_name')]
+    if len(venue_events) < len(events):
+        logger.info(f"  {len(events) - len(venue_events)} events without a venue left for a later run")
+
+    # Unresolvable addresses are only retried on backoff, or as soon as the address changes
+    due_events = filter_due('geocode', venue_events, input_key=geocode_address)
+    metrics['queues']['geocode_due'] = len(due_events)
+    if len(due_events) < len(venue_events):
+        logger.info(f"  {len(venue_events) - len(due_events)} events with unresolvable addresses not due for retry")
+    return due_events
+
+
+def apply_geocode(e, address, lat, lng, status):
+    """Write a Google result to its event; returns the coordinates written, or None"""
+    coords = None
+    if lat and lng:
+        coords = {'latitude': lat, 'longitude': lng, 'geo_precision': 'venue'}
+        if db_patch("events", f"id=eq.{e['id']}", coords):
+            record_change('event', e['id'], 'geocoded', {k: e.get(k) for k in coords}, coords)
+        else:
+            coords = None
+        record_attempt('geocode', e['id'], True)
+    elif status == 'ZERO_RESULTS':
+        # Quota/transport errors aren't evidence the address is unresolvable
+        record_attempt('geocode', e['id'], False, input_key=address)
+    return coords
+
+
+def geocode_events(event_ids=None):
+    """Geocode events that are missing coordinates or only have city-level ones
+    (optionally only the given IDs). Events without any coordinates get an
+    offline city pin first; Google is only asked about events with a venue.
+    Returns {event_id: {latitude, longitude, geo_precision}} for the events that were coded."""
+    load_config()
+    all_events = geocode_candidates(event_ids)
     if not all_events:
-        logger.info("All events have coordinates")
-        return
+        return {}
+    results = pin_cities(all_events)
+
+    if not GOOGLE_API_KEY:
+        logger.warning("No GOOGLE_MAPS_API_KEY — skipping venue geocoding")
+        return results
 
-    logger.info(f"Geocoding {len(all_events)} events...")
+    due_events = venue_geocode_due(all_events)
+    if not due_events:
+        return results
+
+    logger.info(f"Geocoding {len(due_events)} events...")
     coded = 0
 
-    for i, e in enumerate(all_events):
+    for i, e in enumerate(due_events):
         if (i + 1) % 50 == 0:
-            logger.info(f"  Geocoding {i+1}/{len(all_events)}...")
-
-        # Try venue_address first (more specific), fall back to venue_name
-        venue = e.get('venue_address') or e.get('venue_name')
-        lat, lng = geocode(venue, e.get('city'), e.get('state'), e.get('country', 'USA'))
+            logger.info(f"  Geocoding {i+1}/{len(due_events)}...")
 
-        if lat and lng:
-            if db_patch("events", f"id=eq.{e['id']}", {'latitude': lat, 'longitude': lng}):
-                coded += 1
+        address = geocode_address(e)
+        coords = apply_geocode(e, address, *geocode_query(address))
+        if coords:
+            coded += 1
+            results[e['id']] = coords
 
         time.sleep(0.1)  # Rate limit
 
-    logger.info(f"Geocoded: {coded}/{len(all_events)}")
+    logger.info(f"Geocoded: {coded}/{len(due_events)}")
+    return results
 
 
 # ============================================
 # STEP 5: CHAMPIONSHIPS
 # ============================================
 
+# Lookups that don't change between daemon cycles
+_cm_promo_cache = {}    # promotion name -> Cagematch promotion ID
+_wrestler_cache = {}    # wrestler name.lower() -> wrestlers row
+
+
 def find_promotion_on_cagematch(promo_name):
     """Search Cagematch for a promotion and return its ID"""
-    search_url = f"{BASE_URL}/?id=8&view=promotions&search={requests.utils.quote(promo_name)}"
+    if promo_name in _cm_promo_cache:
+        return _cm_promo_cache[promo_name]
+    cm_id = _search_promotion_on_cagematch(promo_name)
+    if cm_id:
+        _cm_promo_cache[promo_name] = cm_id
+    return cm_id
+
+
+def _search_promotion_on_cagematch(promo_name):
+    search_url = f"{BASE_URL}/?id=8&view=promotions&search={quote(promo_name)}"
     try:
-        time.sleep(1.5)
-        resp = requests.get(search_url, headers=SCRAPE_HEADERS, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        resp = cagematch_get(search_url)
+        soup = parse_html(resp.text)
         for link in soup.find_all('a', href=True):
             href = link.get('href', '')
             if 'id=8' in href and 'nr=' in href and 'page=' not in href:
@@ -764,20 +2532,20 @@ def find_promotion_on_cagematch(promo_name):
                     match = re.search(r'nr=(\d+)', href)
                     if match:
                         return match.group(1)
+    except CagematchUnavailable:
+        raise
     except Exception as e:
         logger.warning(f"Cagematch search error for {promo_name}: {e}")
     return None
 
 
 def scrape_title_page(cm_promo_id):
-    """Scrape current titles from Cagematch promotion page"""
+    """Scrape current titles from Cagematch promotion page (list of ChampionshipTitle)"""
     url = f"{BASE_URL}/?id=8&nr={cm_promo_id}&page=5&reign=current"
     titles = []
     try:
-        time.sleep(1.5)
-        resp = requests.get(url, headers=SCRAPE_HEADERS, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        resp = cagematch_get(url)
+        soup = parse_html(resp.text)
         tables = soup.find_all('div', class_='TableContents')
         for table in tables:
             rows = table.find_all('tr')
@@ -803,7 +2571,9 @@ def scrape_title_page(cm_promo_id):
                     # Filter vacant
                     champion_names = [c for c in champion_names if c.lower() != 'vacant']
                     if champion_names:
-                        titles.append({'name': title_name, 'champions': champion_names})
+                        titles.append(ChampionshipTitle(name=title_name, champions=champion_names))
+    except CagematchUnavailable:
+        raise
     except Exception as e:
         logger.warning(f"Title scrape error for promo {cm_promo_id}: {e}")
     return titles
@@ -811,7 +2581,18 @@ def scrape_title_page(cm_promo_id):
 
 def find_wrestler_by_name(name):
     """Match wrestler name to database"""
-    encoded = requests.utils.quote(name)
+    key = name.lower()
+    if key in _wrestler_cache:
+        return _wrestler_cache[key]
+    w = _query_wrestler_by_name(name)
+    if w:
+        # Misses aren't cached — the wrestler may be added before the next cycle
+        _wrestler_cache[key] = w
+    return w
+
+
+def _query_wrestler_by_name(name):
+    encoded = quote(name)
     results = db_get(f"wrestlers?select=id,name,slug&name=ilike.{encoded}&limit=1")
     if results:
         return results[0]
@@ -825,201 +2606,964 @@ def find_wrestler_by_name(name):
     return None
 
 
-def sync_championships():
-    """Scrape championships for all promotions in DB"""
+def championship_promotions():
+    """Promotions whose championships are synced (excluded promotions dropped)"""
     promos = db_get("promotions?select=id,name,slug,country")
     # Exclude WWE/AEW etc
-    filtered = []
-    for p in promos:
-        name_lower = p['name'].lower()
-        excluded = any(excl in name_lower or name_lower in excl for excl in EXCLUDED_PROMOTIONS)
-        if not excluded:
-            filtered.append(p)
+    excluded = rules().excluded_batch([[p['name']] for p in promos])
+    return [p for p, skip in zip(promos, excluded) if not skip]
+
+
+def scrape_promotion_titles(promo_name):
+    """A promotion's current titles from Cagematch ([] if it can't be found there)"""
+    cm_id = find_promotion_on_cagematch(promo_name)
+    if not cm_id:
+        return []
+    return scrape_title_page(cm_id)
+
+
+def apply_championships(promo, titles):
+    """Create/update promotion_championships rows for one promotion's scraped titles.
+    Returns the changes made."""
+    changes = []
+    existing = db_get(f"promotion_championships?select=id,name,short_name,cagematch_name,locked,won_date,current_champion_id,current_champion_2_id,is_active&promotion_id=eq.{promo['id']}")
+
+    # Build lookup: cagematch_name first, then name
+    def find_existing(cm_title_name):
+        cm_lower = cm_title_name.lower()
+        for c in existing:
+            if c.get('cagematch_name') and c['cagematch_name'].lower() == cm_lower:
+                return c
+        for c in existing:
+            if c['name'].lower() == cm_lower:
+                return c
+        return None
+
+    for i, title in enumerate(titles):
+        # Skip titles from other major promotions (e.g. NWA/TNA titles defended at indie shows)
+        if is_foreign_title(title.name, promo['name']):
+            logger.info(f"  Skipped (foreign title): {title.name}")
+            continue
+
+        champ_1_id = champ_2_id = champ_1_slug = None
+        if len(title.champions) >= 1:
+            w = find_wrestler_by_name(title.champions[0])
+            if w:
+                champ_1_id, champ_1_slug = w['id'], w.get('slug')
+        if len(title.champions) >= 2:
+            w = find_wrestler_by_name(title.champions[1])
+            if w:
+                champ_2_id = w['id']
+
+        # Short name
+        short_name = title.name
+        for long, short in [('Heavyweight Championship', 'Heavyweight'), ('World Championship', 'World'),
+                            ('Tag Team Championship', 'Tag Team'), ("Women's Championship", "Women's"),
+                            ('Television Championship', 'TV'), ('Cruiserweight Championship', 'Cruiserweight')]:
+            if long.lower() in title.name.lower():
+                short_name = short
+                break
+
+        existing_champ = find_existing(title.name)
+        if existing_champ:
+            # Skip locked championships (promoter has manual control)
+            if existing_champ.get('locked'):
+                logger.info(f"  Skipped (locked): {title.name}")
+                continue
+
+            update_data = {}
+            if champ_1_id and existing_champ.get('current_champion_id') != champ_1_id:
+                update_data['current_champion_id'] = champ_1_id
+            if champ_2_id and existing_champ.get('current_champion_2_id') != champ_2_id:
+                update_data['current_champion_2_id'] = champ_2_id
+            if not champ_2_id and len(title.champions) < 2:
+                update_data['current_champion_2_id'] = None
+            if update_data and db_patch("promotion_championships", f"id=eq.{existing_champ['id']}", update_data):
+                record_change('championship', existing_champ['id'], 'updated',
+                              {k: existing_champ.get(k) for k in update_data}, {**update_data, 'champions': title.champions})
+                changes.append({'action': 'updated', 'championship_id': existing_champ['id'],
+                                'promotion': promo['name'], 'promotion_id': promo['id'],
+                                'title': title.name, 'champions': title.champions,
+                                'champion_id': champ_1_id, 'champion_slug': champ_1_slug,
+                                'won_date': title.won_date})
+        else:
+            new_data = {
+                "promotion_id": promo['id'], "name": title.name, "short_name": short_name,
+                "cagematch_name": title.name,
+                "current_champion_id": champ_1_id, "current_champion_2_id": champ_2_id,
+                "is_active": True, "sort_order": i,
+            }
+            result = db_post("promotion_championships", new_data)
+            if result:
+                record_change('championship', result['id'], 'created', after={**new_data, 'champions': title.champions})
+                changes.append({'action': 'created', 'championship_id': result['id'],
+                                'promotion': promo['name'], 'promotion_id': promo['id'],
+                                'title': title.name, 'champions': title.champions,
+                                'champion_id': champ_1_id, 'champion_slug': champ_1_slug,
+                                'won_date': title.won_date})
+    return changes
+
+
+def sync_championships():
+    """Scrape championships for all promotions in DB.
+    Returns a list of the championships created or updated."""
+    filtered = championship_promotions()
 
     logger.info(f"Checking championships for {len(filtered)} promotions...")
-    total_updated = 0
     processed = 0
+    changes = []
 
     for promo in filtered:
         try:
-            cm_id = find_promotion_on_cagematch(promo['name'])
-            if not cm_id:
+            titles = scrape_promotion_titles(promo['name'])
+            if not titles:
                 continue
+            changes += apply_championships(promo, titles)
+            processed += 1
+        except CagematchUnavailable as e:
+            logger.error(f"Championships stopped: {e}")
+            break
+        except Exception as e:
+            logger.error(f"Championship error for {promo['name']}: {e}")
 
-            titles = scrape_title_page(cm_id)
-            if not titles:
+    logger.info(f"Championships: {processed} promotions processed, {len(changes)} created/updated")
+    return changes
+
+
+# ============================================
+# STEP 6: HOMEPAGE NEWS
+# ============================================
+
+def days_since(date_str):
+    """Whole days since an ISO date/timestamp (None if it doesn't parse)"""
+    try:
+        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    return (datetime.now(dt.tzinfo) - dt).days
+
+
+def new_event_news(new_event_ids, seen_events, expires_at):
+    """One news item per promotion for a run's new events: the event itself
+    for a single show, "X announces N new shows" for more.
+
+    A grouped item only records its earliest show, so a group counts as
+    already covered if any of its shows has news (a re-run over the same IDs
+    would otherwise announce the other N-1 again)."""
+    db = state_db()
+    groups = {}   # promotion_id -> [event rows by date]
+    for event_id in dict.fromkeys(str(i) for i in new_event_ids):
+        row = db.execute("SELECT id, name, event_date, promotion_id FROM events_mirror WHERE id = ?",
+                         (str(event_id),)).fetchone()
+        if row:
+            groups.setdefault(row['promotion_id'], []).append(row)
+
+    items = []
+    for promo_id, rows in groups.items():
+        rows.sort(key=lambda r: (r['event_date'] or '', r['id']))
+        promo = db.execute("SELECT name, slug FROM promotions_mirror WHERE id = ?",
+                           (promo_id,)).fetchone() if promo_id else None
+        if promo and len(rows) > 1:
+            if any(str(r['id']) in seen_events for r in rows):
                 continue
+            batches = [(f"{promo['name']} announces {len(rows)} new shows",
+                        f"/promotions/{promo['slug']}" if promo['slug'] else f"/events/{rows[0]['id']}", rows[0])]
+        else:
+            batches = [(f"{promo['name']} announces {r['name']}" if promo else f"New show: {r['name']}",
+                        f"/events/{r['id']}", r) for r in rows if str(r['id']) not in seen_events]
+        for title, link, first in batches:
+            # The earliest show anchors the item (see the group check above)
+            items.append({
+                "type": "new_event",
+                "title": title,
+                "link_url": link,
+                "related_event_id": first['id'],
+                "related_promotion_id": promo_id,
+                "is_auto": True,
+                "sort_order": 1,
+                "expires_at": expires_at,
+            })
+    return items
 
-            existing = db_get(f"promotion_championships?select=id,name,short_name,cagematch_name,locked,won_date,current_champion_id,current_champion_2_id,is_active&promotion_id=eq.{promo['id']}")
-
-            # Build lookup: cagematch_name first, then name
-            def find_existing(cm_title_name):
-                cm_lower = cm_title_name.lower()
-                for c in existing:
-                    if c.get('cagematch_name') and c['cagematch_name'].lower() == cm_lower:
-                        return c
-                for c in existing:
-                    if c['name'].lower() == cm_lower:
-                        return c
-                return None
-
-            for i, title in enumerate(titles):
-                # Skip titles from other major promotions (e.g. NWA/TNA titles defended at indie shows)
-                if is_foreign_title(title['name'], promo['name']):
-                    logger.info(f"  Skipped (foreign title): {title['name']}")
-                    continue
 
-                champ_1_id = champ_2_id = None
-                if len(title['champions']) >= 1:
-                    w = find_wrestler_by_name(title['champions'][0])
-                    if w:
-                        champ_1_id = w['id']
-                if len(title['champions']) >= 2:
-                    w = find_wrestler_by_name(title['champions'][1])
-                    if w:
-                        champ_2_id = w['id']
-
-                # Short name
-                short_name = title['name']
-                for long, short in [('Heavyweight Championship', 'Heavyweight'), ('World Championship', 'World'),
-                                    ('Tag Team Championship', 'Tag Team'), ("Women's Championship", "Women's"),
-                                    ('Television Championship', 'TV'), ('Cruiserweight Championship', 'Cruiserweight')]:
-                    if long.lower() in title['name'].lower():
-                        short_name = short
-                        break
+def title_change_news(title_changes, seen_titles, expires_at):
+    """News for newly tracked championships won in the last NEWS_TITLE_CHANGE_DAYS"""
+    items = []
+    for c in title_changes:
+        if c.get('action') != 'created' or not c.get('champion_id') or not c.get('won_date'):
+            continue
+        age = days_since(c['won_date'])
+        if age is None or age > NEWS_TITLE_CHANGE_DAYS:
+            continue
+        if (str(c['championship_id']), str(c['champion_id'])) in seen_titles:
+            continue
+        items.append({
+            "type": "title_change",
+            "title": f"{c['champions'][0]} wins the {c['title']}!",
+            "link_url": f"/wrestlers/{c['champion_slug']}" if c.get('champion_slug') else None,
+            "related_wrestler_id": c['champion_id'],
+            "related_promotion_id": c.get('promotion_id'),
+            "related_championship_id": c['championship_id'],
+            "is_auto": True,
+            "sort_order": 1,
+            "display_date": c['won_date'],
+            "expires_at": expires_at,
+        })
+    return items
 
-                existing_champ = find_existing(title['name'])
-                if existing_champ:
-                    # Skip locked championships (promoter has manual control)
-                    if existing_champ.get('locked'):
-                        logger.info(f"  Skipped (locked): {title['name']}")
-                        continue
 
-                    update_data = {}
-                    if champ_1_id and existing_champ.get('current_champion_id') != champ_1_id:
-                        update_data['current_champion_id'] = champ_1_id
-                    if champ_2_id and existing_champ.get('current_champion_2_id') != champ_2_id:
-                        update_data['current_champion_2_id'] = champ_2_id
-                    if not champ_2_id and len(title['champions']) < 2:
-                        update_data['current_champion_2_id'] = None
-                    if update_data:
-                        db_patch("promotion_championships", f"id=eq.{existing_champ['id']}", update_data)
-                        total_updated += 1
-                else:
-                    result = db_post("promotion_championships", {
-                        "promotion_id": promo['id'], "name": title['name'], "short_name": short_name,
-                        "cagematch_name": title['name'],
-                        "current_champion_id": champ_1_id, "current_champion_2_id": champ_2_id,
-                        "is_active": True, "sort_order": i,
-                    })
-                    if result:
-                        total_updated += 1
-
-                        # Create homepage news for new championship (only for recently won titles)
-                        won_date = title.get('won_date')
-                        if champ_1_id and len(title['champions']) >= 1 and won_date:
-                            from datetime import datetime as dt_cls
-                            try:
-                                won_dt = dt_cls.fromisoformat(won_date.replace('Z', '+00:00'))
-                                days_since = (datetime.now(won_dt.tzinfo) - won_dt).days if won_dt.tzinfo else (datetime.now() - won_dt).days
-                            except Exception:
-                                days_since = 999
-                            if days_since <= 14:
-                                w = find_wrestler_by_name(title['champions'][0])
-                                champ_link = f"/wrestlers/{w['slug']}" if w else None
-                                db_post("homepage_news", {
-                                    "type": "title_change",
-                                    "title": f"{title['champions'][0]} wins the {title['name']}!",
-                                    "link_url": champ_link,
-                                    "related_wrestler_id": champ_1_id,
-                                    "related_promotion_id": promo['id'],
-                                    "related_championship_id": result['id'],
-                                    "is_auto": True,
-                                    "sort_order": 1,
-                                    "display_date": won_date,
-                                    "expires_at": (datetime.now() + timedelta(days=10)).isoformat(),
-                                })
+def publish_news(new_event_ids=(), title_changes=()):
+    """Post-load stage: turn a run's new events (from load_events) and title
+    changes (from sync_championships) into homepage_news.
 
-            processed += 1
+    Anything already covered by unexpired auto news is dropped — checked with
+    one bulk read — and the rest goes out as a single batched insert.
+    Returns the inserted news rows."""
+    if not new_event_ids and not title_changes:
+        return []
+    now = datetime.now()
+    existing = fetch_all("homepage_news?select=related_event_id,related_championship_id,related_wrestler_id"
+                         f"&is_auto=eq.true&or=(expires_at.is.null,expires_at.gt.{now.isoformat()})")
+    seen_events = {str(n['related_event_id']) for n in existing if n.get('related_event_id')}
+    seen_titles = {(str(n['related_championship_id']), str(n['related_wrestler_id']))
+                   for n in existing if n.get('related_championship_id')}
+
+    expires_at = (now + timedelta(days=NEWS_EXPIRE_DAYS)).isoformat()
+    items = new_event_news(new_event_ids, seen_events, expires_at) + title_change_news(title_changes, seen_titles, expires_at)
+    if not items:
+        logger.info("News: nothing new")
+        return []
+
+    created = db_post_many("homepage_news", items)
+    logger.info(f"News: {len(created)}/{len(items)} items posted "
+                f"({len(new_event_ids)} new events, {len(title_changes)} championship changes)")
+    return created
+
+
+# ============================================
+# STAGE EXECUTOR
+# ============================================
+
+@dataclass(slots=True)
+class Stage:
+    """One pipeline step. fn gets {stage name: return value} for the stages it runs after."""
+    name: str
+    fn: object
+    after: tuple = ()
+
+
+def run_stages(stages, max_parallel=None):
+    """Run each stage as soon as the stages it runs after have finished, with
+    independent stages in parallel threads. Cagematch traffic from every stage
+    still goes through the one cagematch_rate controller. A failed stage skips
+    the stages that depend on it.
+
+    Returns (results, timings): return values by stage name, and
+    {name: (start, end)} in seconds from the start of the run."""
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    names = {s.name for s in stages}
+    for stage in stages:
+        unknown = set(stage.after) - names
+        if unknown:
+            raise ValueError(f"Stage {stage.name} runs after unknown stage(s): {', '.join(sorted(unknown))}")
+    limit = max_parallel or len(stages)
+
+    results, timings, failed = {}, {}, set()
+    pending, running = list(stages), {}
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+        while pending or running:
+            for stage in list(pending):
+                blocked = [d for d in stage.after if d in failed]
+                if blocked:
+                    logger.warning(f"Stage {stage.name} skipped: {', '.join(blocked)} failed")
+                    failed.add(stage.name)
+                    pending.remove(stage)
+                elif all(d in results for d in stage.after) and len(running) < limit:
+                    pending.remove(stage)
+                    logger.info(f"▶ {stage.name}")
+                    timings[stage.name] = (time.time() - t0, None)
+                    running[pool.submit(stage.fn, {d: results[d] for d in stage.after})] = stage
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                start = timings[stage.name][0]
+                timings[stage.name] = (start, time.time() - t0)
+                try:
+                    results[stage.name] = future.result()
+                    logger.info(f"✓ {stage.name} ({timings[stage.name][1] - start:.1f}s)")
+                except Exception as e:
+                    failed.add(stage.name)
+                    logger.error(f"✗ {stage.name} failed: {e}", exc_info=e)
+    return results, timings
+
+
+def critical_path(stages, timings):
+    """The chain of stages that decided when the run finished: from the last
+    stage to finish, back through whichever of its dependencies finished last"""
+    after = {s.name: s.after for s in stages}
+    if not timings:
+        return []
+    node = max(timings, key=lambda n: timings[n][1])
+    path = [node]
+    while True:
+        deps = [d for d in after[node] if d in timings]
+        if not deps:
+            break
+        node = max(deps, key=lambda d: timings[d][1])
+        path.append(node)
+    return path[::-1]
+
+
+def print_stage_report(stages, results, timings):
+    print_step("RUN REPORT")
+    for name, (start, end) in sorted(timings.items(), key=lambda t: t[1]):
+        status = '' if name in results else '  FAILED'
+        print(f"  {name:<14} {start:7.1f}s → {end:7.1f}s  {end - start:7.1f}s{status}")
+    for stage in stages:
+        if stage.name not in timings:
+            print(f"  {stage.name:<14} skipped")
+    if not timings:
+        return
+    wall = max(end for _, end in timings.values())
+    serial = sum(end - start for start, end in timings.values())
+    path = critical_path(stages, timings)
+    chain = sum(timings[n][1] - timings[n][0] for n in path)
+    print(f"\n  Wall time {wall:.1f}s (back to back: {serial:.1f}s)")
+    print(f"  Critical path: {' → '.join(path)} ({chain:.1f}s running, {wall - chain:.1f}s waiting)")
+
+
+# ============================================
+# WORK QUEUE (coordinator / workers / merge)
+# ============================================
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    phase TEXT NOT NULL,            -- listing -> details -> geocode -> done
+    created_at TEXT NOT NULL,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS work_items (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    kind TEXT NOT NULL,             -- listing, championships, details, geocode
+    item_key TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending, leased, done, failed, skipped, merged
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (run_id, kind, item_key)
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_status ON work_items (status, lease_expires_at);
+CREATE INDEX IF NOT EXISTS idx_work_items_run ON work_items (run_id, kind, status);
+"""
+
+# Work item kinds fetched in each run phase; merge applies them and enqueues the next phase
+RUN_PHASES = {'listing': ('listing', 'championships'), 'details': ('details',), 'geocode': ('geocode',)}
+
+
+class WorkQueue:
+    """Leased work items in a SQLite file that any number of worker processes
+    on the same host drain concurrently.
+
+    The file must be on a local disk: it runs in WAL mode, whose shared-memory
+    locking SQLite doesn't support over network filesystems, and without it
+    leases (and so exactly-once commits) aren't exclusive. It is not a
+    multi-machine transport.
+
+    A lease is taken and a result committed with single UPDATE statements: a
+    result only lands if the committing worker still holds the lease, so an
+    item whose lease expired and was re-leased is committed exactly once."""
+
+    def __init__(self, path=QUEUE_DB_PATH):
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(QUEUE_SCHEMA)
+
+    def create_run(self, params):
+        run_id = datetime.now().strftime('%Y%m%d-%H%M%S-') + os.urandom(3).hex()
+        now = datetime.now().isoformat()
+        self.db.execute("INSERT INTO runs (run_id, params, phase, created_at, updated_at) VALUES (?, ?, 'listing', ?, ?)",
+                        (run_id, json.dumps(params), now, now))
+        return run_id
+
+    def run(self, run_id=None):
+        """A run by ID, or the oldest one not yet done"""
+        if run_id:
+            row = self.db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        else:
+            row = self.db.execute("SELECT * FROM runs WHERE phase != 'done' ORDER BY created_at LIMIT 1").fetchone()
+        return dict(row, params=json.loads(row['params'])) if row else None
+
+    def set_phase(self, run_id, phase):
+        self.db.execute("UPDATE runs SET phase = ?, updated_at = ? WHERE run_id = ?",
+                        (phase, datetime.now().isoformat(), run_id))
+
+    def enqueue(self, run_id, kind, items):
+        """Add (key, payload) items; keys already queued for the run are left alone"""
+        rows = [(run_id, kind, str(key), json.dumps(payload, default=json_default)) for key, payload in items]
+        self.db.execute("BEGIN")
+        self.db.executemany("INSERT OR IGNORE INTO work_items (run_id, kind, item_key, payload) VALUES (?, ?, ?, ?)", rows)
+        self.db.execute("COMMIT")
+        return len(rows)
+
+    def lease(self, owner, lease_seconds=WORK_LEASE_SECONDS):
+        """Take the next pending (or abandoned) item, or None if there is none"""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Abandoned leases that have used up their attempts are given up on
+            self.db.execute("""UPDATE work_items SET status = 'failed', lease_owner = NULL, error = 'lease expired'
+                               WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?""",
+                            (now, WORK_MAX_ATTEMPTS))
+            row = self.db.execute(
+                """UPDATE work_items SET status = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                   WHERE id = (SELECT id FROM work_items
+                               WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ?)
+                               ORDER BY id LIMIT 1)
+                   RETURNING id, run_id, kind, item_key, payload, attempts""",
+                (owner, now + lease_seconds, now)).fetchone()
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return dict(row, payload=json.loads(row['payload'])) if row else None
+
+    def complete(self, item, owner, result):
+        """Commit an item's result; False if the lease was lost (another worker owns it now)"""
+        cur = self.db.execute(
+            """UPDATE work_items SET status = 'done', result = ?, lease_owner = NULL, error = NULL
+               WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+            (json.dumps(result, default=json_default), item['id'], owner))
+        return cur.rowcount == 1
+
+    def fail(self, item, owner, error):
+        """Give an item back for a retry, or mark it failed once out of attempts"""
+        self.db.execute(
+            """UPDATE work_items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                     lease_owner = NULL, error = ?
+               WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+            (WORK_MAX_ATTEMPTS, error, item['id'], owner))
+
+    def skip_after(self, run_id, kind, key):
+        """Drop pending items of a kind whose numeric key is past key (e.g. listing pages beyond the window)"""
+        self.db.execute("""UPDATE work_items SET status = 'skipped'
+                           WHERE run_id = ? AND kind = ? AND status = 'pending' AND CAST(item_key AS INTEGER) > ?""",
+                        (run_id, kind, int(key)))
+
+    def counts(self, run_id, kinds=None):
+        sql = "SELECT status, COUNT(*) AS n FROM work_items WHERE run_id = ?"
+        args = [run_id]
+        if kinds:
+            sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+            args += list(kinds)
+        return {r['status']: r['n'] for r in self.db.execute(sql + " GROUP BY status", args)}
+
+    def results(self, run_id, kind):
+        """(item_key, payload, result) for the committed, not yet merged items of a kind, in key order"""
+        rows = self.db.execute(
+            """SELECT item_key, payload, result FROM work_items WHERE run_id = ? AND kind = ? AND status = 'done'
+               ORDER BY CAST(item_key AS INTEGER), item_key""", (run_id, kind)).fetchall()
+        for r in rows:
+            yield r['item_key'], json.loads(r['payload']), json.loads(r['result'])
+
+    def mark_merged(self, run_id, kinds):
+        self.db.execute(f"UPDATE work_items SET status = 'merged' WHERE run_id = ? AND status = 'done' AND kind IN ({','.join('?' * len(kinds))})",
+                        (run_id, *kinds))
+
+
+def work_listing(params, page, payload):
+    """Worker: one listing page -> the in-window, non-excluded events on it"""
+    events, row_count = ListingCrawl().page(int(page))
+    if row_count is None:
+        raise RuntimeError(f"listing page {page} could not be fetched")
+    start, end = params['start'], params['end']
+    last = events[-1].event_date if events else None
+    # No table, a short page or a page ending past the window: later pages have nothing for this run
+    beyond = not events or row_count < 50 or (last > end if params['ascending'] else last < start)
+    in_window = [e for e in events or [] if start <= e.event_date <= end]
+    excluded = rules().excluded_batch([e.promotion_names for e in in_window])
+    return {'events': [e for e, skip in zip(in_window, excluded) if not skip], 'beyond': beyond}
+
+
+def work_championships(params, promotion_id, payload):
+    """Worker: a promotion's current titles from Cagematch"""
+    return scrape_promotion_titles(payload['name'])
+
+
+def work_details(params, event_id, payload):
+    """Worker: an event page -> EventDetail, plus the page itself (compressed)
+    for merge to keep, so `reprocess` works on the merge host"""
+    source_url = event_page_url(payload['source_url'])
+    html = cagematch_get(source_url).text
+    return {'details': parse_event_page(html), 'source_url': source_url,
+            'page': base64.b64encode(compress_page(html)).decode('ascii')}
+
+
+def work_geocode(params, event_id, payload):
+    """Worker: one Google geocode lookup"""
+    lat, lng, status = geocode_query(payload['address'])
+    if status is None:
+        raise RuntimeError("geocode request failed")
+    return {'latitude': lat, 'longitude': lng, 'status': status}
+
+
+WORK_HANDLERS = {'listing': work_listing, 'championships': work_championships,
+                 'details': work_details, 'geocode': work_geocode}
+
+
+def run_worker(queue, owner, lease_seconds=WORK_LEASE_SECONDS, wait=0, max_items=None):
+    """Drain the queue: lease, fetch, commit, repeat. Workers only fetch
+    (Cagematch/Google, each with this process's own rate budget); every
+    Supabase write happens in merge. Returns the number of items committed."""
+    committed = 0
+    runs = {}
+    while max_items is None or committed < max_items:
+        item = queue.lease(owner, lease_seconds)
+        if item is None:
+            if not wait:
+                break
+            time.sleep(wait)
+            continue
+        run = runs.get(item['run_id']) or runs.setdefault(item['run_id'], queue.run(item['run_id']))
+        try:
+            result = WORK_HANDLERS[item['kind']](run['params'], item['item_key'], item['payload'])
+        except CagematchUnavailable as e:
+            queue.fail(item, owner, str(e))
+            logger.error(f"Worker {owner} stopping: {e}")
+            break
         except Exception as e:
-            logger.error(f"Championship error for {promo['name']}: {e}")
+            logger.warning(f"{item['kind']} {item['item_key']} failed (attempt {item['attempts']}): {e}")
+            queue.fail(item, owner, str(e))
+            continue
+        if not queue.complete(item, owner, result):
+            logger.warning(f"{item['kind']} {item['item_key']}: lease lost before commit, result discarded")
+            continue
+        committed += 1
+        if item['kind'] == 'listing' and result['beyond']:
+            queue.skip_after(item['run_id'], 'listing', item['item_key'])
+    logger.info(f"Worker {owner}: {committed} items committed")
+    logger.info(cagematch_rate.summary())
+    return committed
+
+
+def coordinate_run(queue, max_days=120, start=None, end=None, championships=True):
+    """Create a run and enqueue its first phase: the listing pages from the
+    window's first page on (found with seek_listing), plus one item per
+    promotion for championships. Returns the run ID."""
+    today = datetime.now().strftime("%Y-%m-%d")
+    start = max(start or today, today)
+    end = end or (datetime.strptime(start, "%Y-%m-%d") + timedelta(days=max_days)).strftime("%Y-%m-%d")
+    first, ascending = seek_listing(ListingCrawl(), start, end)
+
+    run_id = queue.create_run({'start': start, 'end': end, 'ascending': ascending})
+    pages = range(first, LISTING_MAX_OFFSET // LISTING_PAGE_SIZE)
+    queue.enqueue(run_id, 'listing', [(n, None) for n in pages])
+    promos = championship_promotions() if championships else []
+    queue.enqueue(run_id, 'championships', [(p['id'], p) for p in promos])
+    logger.info(f"Run {run_id}: {start} .. {end}, {len(pages)} listing pages, {len(promos)} promotions queued")
+    return run_id
+
+
+def merge_listing(queue, run_id):
+    """Load the run's listing pages as one crawl (page order, deduped), apply
+    championship results, post news; then queue details for the events missing them"""
+    def events():
+        seen_ids = set()
+        for _, _, result in queue.results(run_id, 'listing'):
+            for data in result['events']:
+                event = record_from_dict(ScrapedEvent, data)
+                if event.cagematch_id:
+                    if event.cagematch_id in seen_ids:
+                        continue
+                    seen_ids.add(event.cagematch_id)
+                yield event
+
+    new_ids = load_events(events())
+    changes = []
+    for _, promo, titles in queue.results(run_id, 'championships'):
+        changes += apply_championships(promo, [record_from_dict(ChampionshipTitle, t) for t in titles])
+    publish_news(new_event_ids=new_ids, title_changes=changes)
+    queue.mark_merged(run_id, RUN_PHASES['listing'])
 
-    logger.info(f"Championships: {processed} promotions processed, {total_updated} created/updated")
+    due = venue_detail_candidates()
+    queue.enqueue(run_id, 'details', [(e['id'], {'id': e['id'], 'source_url': e['source_url'],
+                                                 **{k: e.get(k) for k in REFRESH_FIELDS}}) for e in due])
+
+
+def merge_details(queue, run_id):
+    """Apply scraped event pages (details, cards, talent); then pin cities offline and queue Google lookups"""
+    updated = 0
+    scraped = {}
+    for _, event, data in queue.results(run_id, 'details'):
+        store_event_page(event['id'], data['source_url'], base64.b64decode(data['page']))
+        details = scraped[event['id']] = event_detail_from_dict(data['details'])
+        if apply_event_detail(event, details):
+            updated += 1
+    logger.info(f"Venue details updated: {updated}")
+    apply_cards_in_batches(scraped)
+    queue.mark_merged(run_id, RUN_PHASES['details'])
+
+    load_config()
+    all_events = geocode_candidates()
+    pin_cities(all_events)
+    due = venue_geocode_due(all_events) if GOOGLE_API_KEY else []
+    queue.enqueue(run_id, 'geocode', [(e['id'], {'id': e['id'], 'address': geocode_address(e)}) for e in due])
+
+
+def merge_geocode(queue, run_id):
+    coded = 0
+    for _, job, result in queue.results(run_id, 'geocode'):
+        if apply_geocode(job, job['address'], result['latitude'], result['longitude'], result['status']):
+            coded += 1
+    queue.mark_merged(run_id, RUN_PHASES['geocode'])
+    logger.info(f"Geocoded: {coded}")
+
+
+MERGE_STEPS = {'listing': (merge_listing, 'details'), 'details': (merge_details, 'geocode'), 'geocode': (merge_geocode, 'done')}
+
+
+def merge_run(queue, run_id=None):
+    """Apply every finished phase of a run and queue the next. Stops at a phase
+    that workers haven't finished yet. Returns the run's phase afterwards."""
+    run = queue.run(run_id)
+    if not run:
+        logger.info("No run to merge")
+        return None
+    run_id, phase = run['run_id'], run['phase']
+    while phase != 'done':
+        counts = queue.counts(run_id, RUN_PHASES[phase])
+        open_items = counts.get('pending', 0) + counts.get('leased', 0)
+        if open_items:
+            logger.info(f"Run {run_id}: {phase} phase still has {open_items} items open — start workers, then merge again")
+            break
+        if counts.get('failed'):
+            logger.warning(f"Run {run_id}: {counts['failed']} {phase} items failed after {WORK_MAX_ATTEMPTS} attempts")
+        fn, next_phase = MERGE_STEPS[phase]
+        logger.info(f"Run {run_id}: merging {phase} ({counts.get('done', 0)} results)")
+        fn(queue, run_id)
+        queue.set_phase(run_id, next_phase)
+        phase = next_phase
+    state_db().commit()
+    return phase
+
+
+# ============================================
+# DAEMON
+# ============================================
+
+def start_health_server(port):
+    """Serve GET /health — last-cycle timings, queue depths and index sizes as JSON"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0].rstrip('/') not in ('', '/health', '/metrics'):
+                self.send_error(404)
+                return
+            body = json.dumps(metrics, default=str).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep polling out of the sync log
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Health endpoint on http://127.0.0.1:{port}/health")
+    return server
+
+
+def run_job(name, fn):
+    """Run one daemon job, recording its timing and outcome in metrics"""
+    job = metrics['jobs'].setdefault(name, {'runs': 0, 'failures': 0})
+    job['last_started'] = datetime.now().isoformat()
+    started = time.time()
+    cagematch_rate.reset_breaker()
+    try:
+        fn()
+        job['last_ok'] = True
+    except Exception as e:
+        logger.exception(f"Daemon job {name} failed: {e}")
+        job['last_ok'] = False
+        job['failures'] += 1
+    job['runs'] += 1
+    job['last_duration_s'] = round(time.time() - started, 1)
+    logger.info(f"Job {name} finished in {job['last_duration_s']}s")
+
+
+def run_daemon(args):
+    """Run the sync steps on their own intervals in one long-lived process.
+
+    HTTP sessions and the wrestler/Cagematch lookups stay in memory between
+    cycles; the event/promotion mirror is delta-refreshed by updated_at.
+    """
+    def listing():
+        events = scrape_events(max_days=args.days)
+        publish_news(new_event_ids=load_events(events))
+        db = state_db()
+        metrics['index'] = {
+            'promotions': db.execute("SELECT COUNT(*) FROM promotions_mirror").fetchone()[0],
+            'events': db.execute("SELECT COUNT(*) FROM events_mirror").fetchone()[0],
+            'watermark': mirror_meta('watermark'),
+        }
+
+    def enrichment():
+        if not args.skip_details:
+            fetch_venue_details()
+            refresh_event_details(budget=args.refresh_budget)
+        if not args.skip_geocode:
+            geocode_events()
+
+    jobs = [('listing', args.listing_interval, listing)]
+    if not (args.skip_details and args.skip_geocode):
+        jobs.append(('enrichment', args.enrichment_interval, enrichment))
+    if not args.skip_championships:
+        jobs.append(('championships', args.championship_interval,
+                     lambda: publish_news(title_changes=sync_championships())))
+
+    if args.health_port:
+        start_health_server(args.health_port)
+    metrics['started_at'] = datetime.now().isoformat()
+
+    next_run = {name: time.time() for name, _, _ in jobs}
+    logger.info("Daemon started: " + ', '.join(f"{name} every {interval}m" for name, interval, _ in jobs))
+    try:
+        while True:
+            for name, interval, fn in jobs:
+                if time.time() >= next_run[name]:
+                    run_job(name, fn)
+                    next_run[name] = time.time() + interval * 60
+            metrics['next_runs'] = {name: datetime.fromtimestamp(t).isoformat() for name, t in next_run.items()}
+            time.sleep(max(1, min(next_run.values()) - time.time()))
+    except KeyboardInterrupt:
+        logger.info("Daemon stopped")
 
 
 # ============================================
 # MAIN
 # ============================================
 
-def main():
-    parser = argparse.ArgumentParser(description='HotTag - Unified event sync pipeline')
-    parser.add_argument('--days', type=int, default=120, help='Days ahead to scrape (default: 120)')
-    parser.add_argument('--skip-details', action='store_true', help='Skip venue detail scraping')
-    parser.add_argument('--skip-geocode', action='store_true', help='Skip geocoding')
-    parser.add_argument('--skip-championships', action='store_true', help='Skip championship scraping')
-    parser.add_argument('--dry-run', action='store_true', help='Scrape only, save to JSON, don\'t load into DB')
-    parser.add_argument('--output', type=str, default='events_sync.json', help='JSON output file for dry-run')
-    args = parser.parse_args()
+COMMANDS = ('scrape', 'load', 'details', 'reprocess', 'geocode', 'championships', 'build-city-index',
+            'coordinate', 'worker', 'merge', 'changes', 'all')
+
+
+def read_json(path):
+    """Read JSON from a file, or stdin for '-'"""
+    if path == '-':
+        return json.load(sys.stdin)
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data, indent=2):
+    """Write JSON to a file, or stdout for '-'"""
+    if path == '-':
+        json.dump(data, sys.stdout, indent=indent, default=json_default)
+        sys.stdout.write('\n')
+        return
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=indent, default=json_default)
+
+
+def read_event_ids(path):
+    """Event IDs from a file: a JSON list of IDs, or of objects with an 'id' (e.g. `load --output`)"""
+    data = read_json(path)
+    if isinstance(data, dict):
+        data = list(data)
+    return [d['id'] if isinstance(d, dict) else d for d in data]
 
+
+def require_db():
+    load_config()
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("ERROR: Missing SUPABASE_URL or SUPABASE_KEY in .env")
-        return
+        return False
+    return True
 
-    start = time.time()
 
-    # Step 1: Scrape
-    print(f"\n{'='*60}")
-    print("STEP 1: SCRAPING CAGEMATCH")
-    print(f"{'='*60}")
-    events = scrape_events(max_days=args.days)
+def iso_date(value):
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
 
-    # Country breakdown
-    countries = {}
+
+def print_step(title, file=None):
+    print(f"\n{'='*60}", file=file)
+    print(title, file=file)
+    print(f"{'='*60}", file=file)
+
+
+def tally_countries(events, countries):
+    """Pass scraped events through, counting them by country as they go"""
     for e in events:
-        c = e.get('country') or 'Unknown'
+        c = e.country or 'Unknown'
         countries[c] = countries.get(c, 0) + 1
-    print(f"\nBy country:")
+        yield e
+
+
+def summary_stream(output):
+    """Where to print a command's summary: stderr when the data itself goes to stdout ('-')"""
+    return sys.stderr if output == '-' else sys.stdout
+
+
+def print_country_breakdown(countries, file=None):
+    print(f"\nBy country:", file=file)
     for c, n in sorted(countries.items(), key=lambda x: -x[1])[:20]:
-        print(f"  {c}: {n}")
+        print(f"  {c}: {n}", file=file)
 
-    if args.dry_run:
-        with open(args.output, 'w') as f:
-            json.dump(events, f, indent=2)
-        print(f"\nDry run — saved {len(events)} events to {args.output}")
+
+def cmd_scrape(args):
+    countries = {}
+    events = scrape_events(max_days=args.days, start=args.date_from, end=args.date_to)
+    count = write_records(args.output, tally_countries(events, countries))
+    out = summary_stream(args.output)
+    print_country_breakdown(countries, file=out)
+    print(f"\nSaved {count} events to {args.output}", file=out)
+
+
+def cmd_load(args):
+    if not require_db():
         return
+    new_ids = load_events(read_records(args.input, ScrapedEvent))
+    if not args.no_news:
+        publish_news(new_event_ids=new_ids)
+    if args.output:
+        write_json(args.output, new_ids)
 
-    # Step 2: Load
-    print(f"\n{'='*60}")
-    print("STEP 2: LOADING INTO SUPABASE")
-    print(f"{'='*60}")
-    new_ids = load_events(events)
 
-    # Step 3: Venue details
+def cmd_details(args):
+    if not require_db():
+        return
+    event_ids = read_event_ids(args.input) if args.input else None
+    results = fetch_venue_details(event_ids)
+    if event_ids is None:
+        refresh_event_details(budget=args.refresh_budget)
+    if args.output:
+        write_json(args.output, results)
+
+
+def cmd_reprocess(args):
+    if not require_db():
+        return
+    reprocess_event_pages(read_event_ids(args.input) if args.input else None)
+
+
+def cmd_geocode(args):
+    if not require_db():
+        return
+    event_ids = read_event_ids(args.input) if args.input else None
+    results = geocode_events(event_ids)
+    if args.output:
+        write_json(args.output, results)
+
+
+def cmd_championships(args):
+    if not require_db():
+        return
+    changes = sync_championships()
+    if not args.no_news:
+        publish_news(title_changes=changes)
+    if args.output:
+        write_json(args.output, changes)
+
+
+def cmd_build_city_index(args):
+    count = build_city_index(args.cities, args.admin1, args.countries, Path(args.output))
+    print(f"\nIndexed {count} city keys into {args.output}")
+
+
+def cmd_coordinate(args):
+    if not args.skip_championships and not require_db():
+        return
+    run_id = coordinate_run(WorkQueue(args.queue), max_days=args.days, start=args.date_from, end=args.date_to,
+                            championships=not args.skip_championships)
+    print(run_id)
+
+
+def cmd_worker(args):
+    owner = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    run_worker(WorkQueue(args.queue), owner, lease_seconds=args.lease_seconds, wait=args.wait, max_items=args.max_items)
+
+
+def cmd_merge(args):
+    if not require_db():
+        return
+    phase = merge_run(WorkQueue(args.queue), args.run)
+    if phase and phase != 'done':
+        print(f"\nRun is at the {phase} phase: run workers again, then merge")
+
+
+def cmd_changes(args):
+    count = write_records(args.output, read_changes(args.since, args.limit))
+    if args.output != '-':
+        print(f"\nSaved {count} changes after #{args.since} to {args.output}")
+
+
+def cmd_all(args):
+    if not require_db():
+        return
+
+    if args.daemon:
+        run_daemon(args)
+        return
+
+    start = time.time()
+
+    countries = {}
+    events = tally_countries(scrape_events(max_days=args.days, start=args.date_from, end=args.date_to), countries)
+
+    if args.dry_run:
+        out = summary_stream(args.output)
+        print_step("STEP 1: SCRAPING CAGEMATCH", file=out)
+        count = write_records(args.output, events)
+        print_country_breakdown(countries, file=out)
+        print(f"\nDry run — saved {count} events to {args.output}", file=out)
+        return
+
+    # Listing rows go straight from the crawl into the load, a page at a time;
+    # everything else runs as soon as what it needs is done
+    print_step("SYNC")
+    stages = [Stage('listing', lambda r: load_events(events))]
     if not args.skip_details:
-        print(f"\n{'='*60}")
-        print("STEP 3: SCRAPING VENUE DETAILS")
-        print(f"{'='*60}")
-        fetch_venue_details()
+        stages.append(Stage('details', lambda r: fetch_venue_details(), after=('listing',)))
+        stages.append(Stage('refresh', lambda r: refresh_event_details(budget=args.refresh_budget), after=('listing',)))
     else:
-        print("\nSkipping venue details (--skip-details)")
-
-    # Step 4: Geocode
+        print("Skipping venue details (--skip-details)")
     if not args.skip_geocode:
-        print(f"\n{'='*60}")
-        print("STEP 4: GEOCODING")
-        print(f"{'='*60}")
-        geocode_events()
+        # Venue geocoding needs the venues the details stage finds
+        stages.append(Stage('geocode', lambda r: geocode_events(), after=('details',) if not args.skip_details else ('listing',)))
     else:
-        print("\nSkipping geocoding (--skip-geocode)")
-
-    # Step 5: Championships
+        print("Skipping geocoding (--skip-geocode)")
     if not args.skip_championships:
-        print(f"\n{'='*60}")
-        print("STEP 5: SCRAPING CHAMPIONSHIPS")
-        print(f"{'='*60}")
-        sync_championships()
+        stages.append(Stage('championships', lambda r: sync_championships()))
     else:
-        print("\nSkipping championships (--skip-championships)")
+        print("Skipping championships (--skip-championships)")
+    # Homepage news for this run's new events and title changes: separate stages, so
+    # a failed championships scrape can't cost the new-event news (run_stages skips dependents)
+    stages.append(Stage('news', lambda r: publish_news(new_event_ids=r['listing']), after=('listing',)))
+    if not args.skip_championships:
+        stages.append(Stage('title-news', lambda r: publish_news(title_changes=r['championships']), after=('championships',)))
+
+    results, timings = run_stages(stages, max_parallel=args.jobs)
+    print_country_breakdown(countries)
+    print_stage_report(stages, results, timings)
 
     elapsed = time.time() - start
     print(f"\n{'='*60}")
@@ -1027,5 +3571,105 @@ def main():
     print(f"{'='*60}")
 
 
+def build_parser():
+    parser = argparse.ArgumentParser(description='HotTag - Unified event sync pipeline')
+    sub = parser.add_subparsers(dest='command', metavar='{' + ','.join(COMMANDS) + '}')
+
+    p = sub.add_parser('scrape', help='Scrape Cagematch listings to an NDJSON file')
+    p.add_argument('--days', type=int, default=120, help='Days ahead to scrape (default: 120)')
+    p.add_argument('--from', dest='date_from', type=iso_date, help='Only events on/after this date (YYYY-MM-DD); seeks straight to it')
+    p.add_argument('--to', dest='date_to', type=iso_date, help='Only events on/before this date (default: --from/today + --days)')
+    p.add_argument('--output', type=str, default='events_sync.ndjson', help="Output file (.gz to compress), '-' for stdout (default: events_sync.ndjson)")
+    p.set_defaults(func=cmd_scrape)
+
+    p = sub.add_parser('load', help='Load a scraped events file into Supabase')
+    p.add_argument('--input', type=str, default='events_sync.ndjson', help="Scraped events (NDJSON, optionally .gz, or an older JSON array), '-' for stdin (default: events_sync.ndjson)")
+    p.add_argument('--output', type=str, help='Write IDs of newly created events here')
+    p.add_argument('--no-news', action='store_true', help="Don't post homepage news for the new events")
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser('details', help='Scrape venue details, match cards and talent for events missing them')
+    p.add_argument('--input', type=str, help='Only these events (JSON list of IDs or of objects with an id)')
+    p.add_argument('--output', type=str, help='Write {event_id: details} for updated events here')
+    p.add_argument('--refresh-budget', type=int, default=REFRESH_BUDGET, help=f'Detail pages to re-scrape for changes when no --input is given (default: {REFRESH_BUDGET}, 0 disables)')
+    p.set_defaults(func=cmd_details)
+
+    p = sub.add_parser('reprocess', help='Re-parse stored event pages (details, cards, talent) without refetching')
+    p.add_argument('--input', type=str, help='Only these events (JSON list of IDs or of objects with an id)')
+    p.set_defaults(func=cmd_reprocess)
+
+    p = sub.add_parser('geocode', help='Geocode events missing coordinates or with only city-level ones')
+    p.add_argument('--input', type=str, help='Only these events (JSON list of IDs or of objects with an id)')
+    p.add_argument('--output', type=str, help='Write {event_id: coordinates} for coded events here')
+    p.set_defaults(func=cmd_geocode)
+
+    p = sub.add_parser('championships', help='Sync current champions for all promotions')
+    p.add_argument('--output', type=str, help='Write the list of created/updated championships here')
+    p.add_argument('--no-news', action='store_true', help="Don't post homepage news for new title holders")
+    p.set_defaults(func=cmd_championships)
+
+    p = sub.add_parser('build-city-index', help='Build the offline city coordinates index from GeoNames dumps')
+    p.add_argument('--cities', type=str, required=True, help='GeoNames cities file (e.g. cities15000.txt)')
+    p.add_argument('--admin1', type=str, required=True, help='GeoNames admin1CodesASCII.txt')
+    p.add_argument('--countries', type=str, help='GeoNames countryInfo.txt, for countries not in gazetteer.json')
+    p.add_argument('--output', type=str, default=str(CITY_INDEX_PATH), help=f'Index file (default: {CITY_INDEX_PATH.name} next to this script)')
+    p.set_defaults(func=cmd_build_city_index)
+
+    p = sub.add_parser('coordinate', help='Queue a sharded run (listing pages, championships) for workers')
+    p.add_argument('--queue', type=str, default=str(QUEUE_DB_PATH), help=f'Work queue file (default: {QUEUE_DB_PATH.name} next to this script)')
+    p.add_argument('--days', type=int, default=120, help='Days ahead to scrape (default: 120)')
+    p.add_argument('--from', dest='date_from', type=iso_date, help='Only events on/after this date (YYYY-MM-DD)')
+    p.add_argument('--to', dest='date_to', type=iso_date, help='Only events on/before this date')
+    p.add_argument('--skip-championships', action='store_true', help='Don\'t queue championship scraping')
+    p.set_defaults(func=cmd_coordinate)
+
+    p = sub.add_parser('worker', help='Lease and fetch queued work items until the queue is empty')
+    p.add_argument('--queue', type=str, default=str(QUEUE_DB_PATH), help=f'Work queue file (default: {QUEUE_DB_PATH.name} next to this script)')
+    p.add_argument('--worker-id', type=str, help='Lease owner name (default: host:pid)')
+    p.add_argument('--lease-seconds', type=int, default=WORK_LEASE_SECONDS, help=f'Lease timeout per item (default: {WORK_LEASE_SECONDS})')
+    p.add_argument('--wait', type=int, default=0, help='Keep polling this many seconds apart when the queue is empty (default: exit)')
+    p.add_argument('--max-items', type=int, help='Stop after committing this many items')
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser('merge', help='Apply finished work items to Supabase and queue the next phase')
+    p.add_argument('--queue', type=str, default=str(QUEUE_DB_PATH), help=f'Work queue file (default: {QUEUE_DB_PATH.name} next to this script)')
+    p.add_argument('--run', type=str, help='Run ID (default: the oldest unfinished run)')
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('changes', help='Print the change feed (NDJSON) after a sequence number')
+    p.add_argument('--since', type=int, default=0, help='Last sequence number already consumed (default: 0, everything)')
+    p.add_argument('--limit', type=int, help='At most this many entries')
+    p.add_argument('--output', type=str, default='-', help="Output file (.gz to compress), '-' for stdout (default)")
+    p.set_defaults(func=cmd_changes)
+
+    p = sub.add_parser('all', help='Full pipeline (default when no subcommand is given)')
+    p.add_argument('--days', type=int, default=120, help='Days ahead to scrape (default: 120)')
+    p.add_argument('--from', dest='date_from', type=iso_date, help='Only sync events on/after this date (YYYY-MM-DD)')
+    p.add_argument('--to', dest='date_to', type=iso_date, help='Only sync events on/before this date')
+    p.add_argument('--skip-details', action='store_true', help='Skip venue detail scraping')
+    p.add_argument('--refresh-budget', type=int, default=REFRESH_BUDGET, help=f'Detail pages to re-scrape for changes (default: {REFRESH_BUDGET}, 0 disables)')
+    p.add_argument('--skip-geocode', action='store_true', help='Skip geocoding')
+    p.add_argument('--skip-championships', action='store_true', help='Skip championship scraping')
+    p.add_argument('--dry-run', action='store_true', help='Scrape only, save to NDJSON, don\'t load into DB')
+    p.add_argument('--output', type=str, default='events_sync.ndjson', help='NDJSON output file for dry-run (.gz to compress)')
+    p.add_argument('--jobs', type=int, help='Most stages to run at once (default: all that are ready; 1 runs them one after another)')
+    p.add_argument('--daemon', action='store_true', help='Keep running, syncing each step on its own interval')
+    p.add_argument('--listing-interval', type=int, default=DAEMON_LISTING_INTERVAL, help=f'Daemon: minutes between listing scrape+load (default: {DAEMON_LISTING_INTERVAL})')
+    p.add_argument('--enrichment-interval', type=int, default=DAEMON_ENRICHMENT_INTERVAL, help=f'Daemon: minutes between details/geocode passes (default: {DAEMON_ENRICHMENT_INTERVAL})')
+    p.add_argument('--championship-interval', type=int, default=DAEMON_CHAMPIONSHIP_INTERVAL, help=f'Daemon: minutes between championship syncs (default: {DAEMON_CHAMPIONSHIP_INTERVAL})')
+    p.add_argument('--health-port', type=int, default=DAEMON_HEALTH_PORT, help=f'Daemon: local health endpoint port, 0 disables (default: {DAEMON_HEALTH_PORT})')
+    p.set_defaults(func=cmd_all)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Bare flags (the pre-subcommand CLI) mean the full pipeline
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['all'] + argv
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
 if __name__ == '__main__':
     main()
@@ -172,6 +172,7 @@ export interface Event {
   country: string
   latitude: number | null
   longitude: number | null
+  geo_precision: 'venue' | 'city' | null
   ticket_url: string | null
   ticket_price_min: number | null
   ticket_price_max: number | null